@@ -0,0 +1 @@
+"""Бенчмарки горячих участков кода; запускаются из корня репозитория через ``python -m benchmarks.<name>``."""
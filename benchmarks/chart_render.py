@@ -0,0 +1,92 @@
+"""
+Сравнение бэкендов отрисовки диаграммы /metrics: время и пиковая память.
+
+Каждый бэкенд меряется в отдельном процессе, чтобы в память не попали модули другого:
+
+    python -m benchmarks.chart_render --renders 20 --buckets 4 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.synthetic import NOW, generate_metrics
+
+RENDERERS = ("matplotlib", "pillow")
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss в Linux — в килобайтах.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child(renderer: str, renders: int, buckets: int) -> None:
+    from src.utilities.metrics_columnar import MetricsColumns
+    from src.utilities.metrics_rollup import Granularity, MetricsRollup
+    from src.utilities.metrics_visualization import render_chart, warm_up_chart_renderer
+
+    rollup = MetricsRollup()
+    rollup.ingest_columns(MetricsColumns.from_models(generate_metrics(20_000, days=62)), now=NOW)
+    chart = rollup.aggregate(Granularity.DAY if buckets > 8 else Granularity.WEEK, buckets, now=NOW).chart
+    base_rss = _max_rss_mb()
+
+    started = time.perf_counter()
+    warm_up_chart_renderer(renderer)
+    import_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    png = render_chart(chart, renderer)
+    first = time.perf_counter() - started
+
+    timings = []
+    for _ in range(renders):
+        started = time.perf_counter()
+        render_chart(chart, renderer)
+        timings.append(time.perf_counter() - started)
+
+    result = {
+        "import_ms": import_seconds * 1000,
+        "first_ms": first * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "rss_mb": _max_rss_mb() - base_rss,
+        "png_kb": len(png) / 1024,
+    }
+    print(json.dumps(result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=20)
+    parser.add_argument("--buckets", type=int, nargs="+", default=[4, 30], help="столбцов на диаграмме")
+    parser.add_argument("--child", nargs=2, metavar=("RENDERER", "BUCKETS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child[0], args.renders, int(args.child[1]))
+        return
+
+    print(
+        f"{'renderer':<11} {'bars':>4} {'import, ms':>11} {'first, ms':>10} "
+        f"{'p50, ms':>8} {'+RSS, MB':>9} {'png, KB':>8}"
+    )
+    for buckets in args.buckets:
+        for renderer in RENDERERS:
+            command = [sys.executable, "-m", "benchmarks.chart_render", "--renders", str(args.renders)]
+            command += ["--child", renderer, str(buckets)]
+            out = subprocess.run(command, check=True, capture_output=True, text=True, env=os.environ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"{renderer:<11} {buckets:>4} {r['import_ms']:>11.1f} {r['first_ms']:>10.1f} "
+                f"{r['median_ms']:>8.1f} {r['rss_mb']:>9.1f} {r['png_kb']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
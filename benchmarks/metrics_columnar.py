@@ -0,0 +1,99 @@
+"""
+Сравнение aggregate_metrics (циклы по MetricModel) и aggregate_columns (NumPy).
+
+    python -m benchmarks.metrics_columnar --sizes 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from collections.abc import Callable
+from dataclasses import asdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.synthetic import NOW, generate_metrics
+from src.moderation.models import MetricType
+from src.utilities.metrics_columnar import EPOCH, US_PER_SECOND, MetricsColumns, aggregate_columns, to_epoch_us
+from src.utilities.metrics_visualization import MetricsAggregate, aggregate_metrics
+from src.utilities.quantiles import PERCENTILES
+
+# Перцентили приходят из скетчей, а пути скармливают им события в разном порядке, поэтому
+# значения могут не совпадать; сравниваем, что оба попадают в точный ранг с этой погрешностью.
+RANK_TOLERANCE = 0.02
+
+
+def best_of(repeat: int, fn: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def exact_samples(columns: MetricsColumns, now: datetime) -> dict[str, np.ndarray]:
+    """Точные отсортированные выборки для перцентилей сводки (окно — последние 7 дней, как в aggregate_*)."""
+    start = to_epoch_us(datetime.combine(now.date() - timedelta(days=6), datetime.min.time(), EPOCH.tzinfo))
+    submits = (columns.timestamps >= start) & (columns.types == MetricType.Submit.value)
+    ts, users = columns.timestamps[submits], columns.users[submits]
+    order = np.lexsort((ts, users))
+    ts, users = ts[order], users[order]
+    deltas = (ts[1:] - ts[:-1])[users[1:] == users[:-1]] / (60 * US_PER_SECOND)
+    return {
+        "submit_minutes_percentiles": np.sort(((ts // US_PER_SECOND) % 86_400) / 60),
+        "between_submits_percentiles": np.sort(deltas),
+    }
+
+
+def assert_percentiles(name: str, values: tuple[float, ...], sample: np.ndarray) -> None:
+    assert len(values) == (len(PERCENTILES) if len(sample) else 0), (name, values)
+    for q, value in zip(PERCENTILES, values):
+        # При равных значениях ранг — отрезок [lo, hi].
+        lo = np.searchsorted(sample, value, side="left") / len(sample)
+        hi = np.searchsorted(sample, value, side="right") / len(sample)
+        assert lo - RANK_TOLERANCE <= q <= hi + RANK_TOLERANCE, (name, q, value, lo, hi)
+
+
+def assert_same(expected: MetricsAggregate, actual: MetricsAggregate, samples: dict[str, np.ndarray]) -> None:
+    for name, value in asdict(expected.summary).items():
+        other = getattr(actual.summary, name)
+        if name.endswith("_percentiles"):
+            assert_percentiles(name, value, samples[name])
+            assert_percentiles(name, other, samples[name])
+            continue
+        if isinstance(value, float):
+            assert math.isclose(value, other, rel_tol=1e-9), (name, value, other)
+        else:
+            assert value == other, (name, value, other)
+    assert expected.chart == actual.chart, (expected.chart, actual.chart)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'events':>10} {'python, s':>10} {'columns build, s':>17} {'numpy, s':>10} {'speedup':>8}")
+    for size in args.sizes:
+        metrics = generate_metrics(size)
+        columns = MetricsColumns.from_models(metrics)
+        assert_same(
+            aggregate_metrics(metrics, now=NOW), aggregate_columns(columns, now=NOW), exact_samples(columns, NOW)
+        )
+
+        python_time = best_of(args.repeat, lambda: aggregate_metrics(metrics, now=NOW))
+        build_time = best_of(args.repeat, lambda: MetricsColumns.from_models(metrics))
+        numpy_time = best_of(args.repeat, lambda: aggregate_columns(columns, now=NOW))
+        print(
+            f"{size:>10} {python_time:>10.4f} {build_time:>17.4f} {numpy_time:>10.4f} "
+            f"{python_time / numpy_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
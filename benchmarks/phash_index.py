@@ -0,0 +1,66 @@
+"""
+Задержка поиска по радиусу Хэмминга в HashIndex в зависимости от размера индекса.
+
+    python -m benchmarks.phash_index --sizes 100000 1000000 5000000 --radius 6
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from src.utilities.phash import RECORD, HashIndex, HashKind
+
+
+def random_records(count: int, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    records = np.empty(count, dtype=RECORD)
+    records["hash"] = rng.integers(0, 2**64, size=count, dtype=np.uint64)
+    records["ref"] = np.arange(count)
+    records["kind"] = HashKind.USER
+    return records
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--radius", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--delta", type=int, default=10_000, help="записей в несжатой части индекса")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    print(f"{'hashes':>10} {'build, s':>9} {'p50, us':>9} {'p99, us':>9} {'max, us':>9} {'found':>6}")
+    for size in args.sizes:
+        records = random_records(size)
+        index = HashIndex()
+        started = time.perf_counter()
+        index.install(HashIndex.build_segment(records), 0)
+        build = time.perf_counter() - started
+        for value in rng.integers(0, 2**64, size=args.delta, dtype=np.uint64).tolist():
+            index.add(value, -1, HashKind.USER)
+
+        # Половина запросов — искажённые копии проиндексированных хэшей, чтобы было что находить.
+        queries = []
+        for i, value in enumerate(records["hash"][rng.integers(0, size, args.queries)].tolist()):
+            if i % 2 == 0:
+                for bit in rng.choice(64, size=args.radius, replace=False).tolist():
+                    value ^= 1 << bit
+            else:
+                value = int(rng.integers(0, 2**64, dtype=np.uint64))
+            queries.append(value)
+
+        timings = []
+        found = 0
+        for value in queries:
+            started = time.perf_counter()
+            found += bool(index.search(value, args.radius))
+            timings.append(time.perf_counter() - started)
+        p50, p99 = np.percentile(timings, [50, 99]) * 1e6
+        print(f"{size:>10} {build:>9.2f} {p50:>9.1f} {p99:>9.1f} {max(timings) * 1e6:>9.1f} {found:>6}")
+
+
+if __name__ == "__main__":
+    main()
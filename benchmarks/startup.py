@@ -0,0 +1,102 @@
+"""
+Время холодного старта: импорт main, сборка диспетчера и API-приложения, обработка первого апдейта.
+
+Каждый замер — отдельный процесс, чтобы модули не были уже импортированы:
+
+    python -m benchmarks.startup --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STAGES = ("import", "dispatcher", "api_app", "first_update", "total")
+
+
+def _child() -> None:
+    started = float(os.environ["STARTUP_BENCH_T0"])
+    marks: dict[str, float] = {}
+
+    t = time.perf_counter()
+    import asyncio
+
+    from aiogram import Bot
+    from aiogram.types import Update
+
+    from main import create_api_app, create_dispatcher
+    from src.core.readiness import Readiness
+    from src.moderation.client import ModerationClient, create_http_session
+
+    marks["import"] = time.perf_counter() - t
+
+    async def run() -> None:
+        bot = Bot("123456:benchmark")
+        session = await create_http_session()
+        try:
+            t = time.perf_counter()
+            readiness = Readiness()
+            dp = create_dispatcher(ModerationClient(base_url="http://127.0.0.1:9", session=session), readiness)
+            marks["dispatcher"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            create_api_app(bot, dp, readiness)
+            marks["api_app"] = time.perf_counter() - t
+
+            # Апдейт без подходящего хендлера: проходит весь путь диспетчера, но не ходит в сеть.
+            update = Update.model_validate(
+                {
+                    "update_id": 1,
+                    "edited_message": {
+                        "message_id": 1,
+                        "date": 0,
+                        "chat": {"id": 1, "type": "private"},
+                        "from": {"id": 1, "is_bot": False, "first_name": "bench"},
+                        "text": "benchmark",
+                    },
+                },
+                context={"bot": bot},
+            )
+            t = time.perf_counter()
+            await dp.feed_update(bot, update)
+            marks["first_update"] = time.perf_counter() - t
+        finally:
+            await session.close()
+            await bot.session.close()
+
+    asyncio.run(run())
+    marks["total"] = time.time() - started
+    print(json.dumps(marks))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if os.environ.get("STARTUP_BENCH_T0"):
+        _child()
+        return
+
+    samples: dict[str, list[float]] = {stage: [] for stage in STAGES}
+    for _ in range(args.runs):
+        env = {**os.environ, "STARTUP_BENCH_T0": repr(time.time())}
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup"], env=env, check=True, capture_output=True, text=True
+        ).stdout
+        marks = json.loads(out.strip().splitlines()[-1])
+        for stage in STAGES:
+            samples[stage].append(marks[stage])
+
+    print(f"{'stage':<14} {'median, ms':>11} {'min, ms':>9}")
+    for stage in STAGES:
+        print(f"{stage:<14} {statistics.median(samples[stage]) * 1000:>11.1f} {min(samples[stage]) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Микробенчмарки горячих функций с сохранением baseline и отчётом о регрессиях.
+
+    python -m benchmarks.suite --save                  # записать baseline
+    python -m benchmarks.suite                         # сравнить с baseline
+    python -m benchmarks.suite -k metrics --threshold 0.15
+
+Код возврата 1, если медиана какого-то бенчмарка хуже baseline больше чем на threshold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from benchmarks.synthetic import (
+    NOW,
+    generate_metric_rows,
+    generate_metrics,
+    generate_moderator_ids,
+    generate_task_payload,
+)
+
+DEFAULT_BASELINE = Path(".benchmarks/baseline.json")
+
+# Каждый кейс — функция, которая готовит данные и возвращает измеряемый вызов без аргументов.
+CASES: dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def case(name: str) -> Callable[[Callable[[], Callable[[], Any]]], Callable[[], Callable[[], Any]]]:
+    def decorator(setup: Callable[[], Callable[[], Any]]) -> Callable[[], Callable[[], Any]]:
+        CASES[name] = setup
+        return setup
+
+    return decorator
+
+
+@case("metrics.aggregate[20k]")
+def _aggregate() -> Callable[[], Any]:
+    from src.utilities.metrics_visualization import aggregate_metrics
+
+    metrics = generate_metrics(20_000)
+    return lambda: aggregate_metrics(metrics, now=NOW)
+
+
+@case("metrics.render_chart")
+def _render() -> Callable[[], Any]:
+    from src.utilities.metrics_visualization import aggregate_metrics, render_chart
+
+    chart = aggregate_metrics(generate_metrics(20_000), now=NOW).chart
+    return lambda: render_chart(chart)
+
+
+@case("metrics.render_chart[pillow]")
+def _render_pillow() -> Callable[[], Any]:
+    from src.utilities.metrics_visualization import aggregate_metrics, render_chart
+
+    chart = aggregate_metrics(generate_metrics(20_000), now=NOW).chart
+    return lambda: render_chart(chart, "pillow")
+
+
+@case("metrics.build_visualization[20k]")
+def _build_visualization() -> Callable[[], Any]:
+    from src.utilities.metrics_visualization import build_metrics_visualization
+
+    metrics = generate_metrics(20_000)
+    return lambda: build_metrics_visualization(metrics, now=NOW)
+
+
+@case("models.metrics_validate[50k]")
+def _metrics_validate() -> Callable[[], Any]:
+    from src.moderation.models import MetricsListModel
+
+    rows = generate_metric_rows(50_000)
+    return lambda: MetricsListModel.model_validate(rows)
+
+
+@case("models.metrics_validate_json[50k]")
+def _metrics_validate_json() -> Callable[[], Any]:
+    from src.moderation.models import MetricsListModel
+
+    raw = json.dumps(generate_metric_rows(50_000)).encode()
+    return lambda: MetricsListModel.model_validate_json(raw)
+
+
+@case("models.task_validate[500 photos]")
+def _task_validate() -> Callable[[], Any]:
+    from src.moderation.models import ModerationTask
+
+    payload = generate_task_payload(photos=500, tags=100)
+    return lambda: ModerationTask.model_validate(payload)
+
+
+@case("notify.send[1000]")
+def _send_notifications() -> Callable[[], Any]:
+    from src.api.services.delivery import DeliveryScheduler
+    from src.api.services.notifications import send_notifications
+
+    class _Message:
+        message_id = 1
+
+    class _StubBot:
+        async def send_message(self, chat_id: int, text: str, reply_markup: Any = None) -> _Message:
+            await asyncio.sleep(0)
+            return _Message()
+
+    bot = _StubBot()
+    ids = generate_moderator_ids(1000)
+    loop = asyncio.new_event_loop()
+
+    def run() -> Any:
+        # Лимиты сняты: меряем накладные расходы рассылки, а не ожидание токенов.
+        scheduler = DeliveryScheduler(global_rate=1e9, chat_rate=1e9, max_concurrency=30)
+        return loop.run_until_complete(send_notifications(bot, ids, "text", scheduler))  # type: ignore[arg-type]
+
+    return run
+
+
+@case("callback.pack")
+def _callback_pack() -> Callable[[], Any]:
+    from src.bot.states.actions import Actions
+    from src.bot.states.moderator_state import ModeratorFactory
+
+    return lambda: ModeratorFactory(action=Actions.APPROVE_PHOTO, user_task_id=123456789).pack()
+
+
+@case("callback.unpack")
+def _callback_unpack() -> Callable[[], Any]:
+    from src.bot.states.actions import Actions
+    from src.bot.states.moderator_state import ModeratorFactory
+
+    packed = ModeratorFactory(action=Actions.APPROVE_PHOTO, user_task_id=123456789).pack()
+    return lambda: ModeratorFactory.unpack(packed)
+
+
+@dataclass
+class Result:
+    median: float
+    min: float
+    loops: int
+    samples: int
+
+
+def measure(fn: Callable[[], Any], *, repeat: int, min_time: float) -> Result:
+    """Как timeit: подбирает число вызовов на замер не короче min_time и возвращает время одного вызова."""
+    fn()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9)))
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - started) / loops)
+    return Result(median=statistics.median(timings), min=min(timings), loops=loops, samples=len(timings))
+
+
+def environment() -> dict[str, str]:
+    return {"python": platform.python_version(), "machine": platform.machine(), "node": platform.node()}
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "-k", dest="pattern", default="", help="запускать только бенчмарки, в имени которых есть строка"
+    )
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="сохранить результаты как baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="допустимое замедление медианы (0.10 = 10%%)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    args = parser.parse_args()
+
+    baseline: dict[str, Any] = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("environment") != environment():
+            print(f"Warning: baseline was recorded in another environment: {baseline.get('environment')}")
+
+    results: dict[str, Result] = {}
+    regressions = []
+    print(f"{'benchmark':<36} {'median':>12} {'min':>12} {'baseline':>12} {'change':>8}")
+    for name, setup in CASES.items():
+        if args.pattern not in name:
+            continue
+        result = results[name] = measure(setup(), repeat=args.repeat, min_time=args.min_time)
+
+        previous = baseline.get("results", {}).get(name)
+        base_text = change_text = "-"
+        if previous is not None:
+            change = result.median / previous["median"] - 1
+            base_text = format_time(previous["median"])
+            change_text = f"{change:+.1%}"
+            if change > args.threshold:
+                regressions.append(name)
+                change_text += " !"
+        print(
+            f"{name:<36} {format_time(result.median):>12} {format_time(result.min):>12} "
+            f"{base_text:>12} {change_text:>8}"
+        )
+
+    if args.save:
+        saved = dict(baseline.get("results", {}))
+        saved.update({name: asdict(result) for name, result in results.items()})
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({"environment": environment(), "results": saved}, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
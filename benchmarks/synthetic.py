@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from src.moderation.models import MetricModel, MetricType
+
+NOW = datetime(2026, 10, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def generate_metric_rows(
+    count: int,
+    *,
+    users: int = 500,
+    days: int = 35,
+    change_share: float = 0.3,
+    now: datetime = NOW,
+    seed: int = 42,
+) -> list[dict]:
+    """Строки в формате ответа /api/metrics: равномерно по времени за последние days дней."""
+    rng = random.Random(seed)
+    span = days * 86_400
+    start = now - timedelta(seconds=span)
+    rows = []
+    for i in range(count):
+        ts = start + timedelta(seconds=rng.randrange(span), microseconds=rng.randrange(1_000_000))
+        rows.append(
+            {
+                "id": i,
+                "username": f"user{rng.randrange(users)}",
+                "type": MetricType.Change.value if rng.random() < change_share else MetricType.Submit.value,
+                "time": ts.isoformat(),
+            }
+        )
+    return rows
+
+
+def generate_metrics(count: int, **kwargs) -> list[MetricModel]:
+    """То же, что generate_metric_rows, но сразу MetricModel (без валидации, чтобы генерация была быстрой)."""
+    return [
+        MetricModel.model_construct(
+            id=row["id"],
+            username=row["username"],
+            type=row["type"],
+            time=datetime.fromisoformat(row["time"]),
+        )
+        for row in generate_metric_rows(count, **kwargs)
+    ]
+
+
+def generate_task_payload(*, photos: int = 200, tags: int = 50, seed: int = 42) -> dict:
+    """Ответ /api/moderation/next с большим числом фото и тегов."""
+    rng = random.Random(seed)
+    return {
+        "userTaskId": rng.randrange(1, 10**9),
+        "taskId": f"task-{rng.randrange(10**6)}",
+        "name": "Сфотографировать закат",
+        "tags": [f"tag{i}" for i in range(tags)],
+        "extendedInfo": {
+            "description": "Описание задачи " * 20,
+            "photosRequired": photos,
+            "examplePhotos": [f"https://cdn.example.com/examples/{i}.jpg" for i in range(photos // 10)],
+            "userPhotos": [f"https://cdn.example.com/users/{rng.randrange(10**9)}.jpg" for _ in range(photos)],
+        },
+    }
+
+
+def generate_moderator_ids(count: int, *, seed: int = 42) -> list[int]:
+    rng = random.Random(seed)
+    return rng.sample(range(10**6, 10**10), count)
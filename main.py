@@ -4,19 +4,26 @@ import uvicorn
 from aiogram import Bot
 
 from src.api.app import create_api_app
-from src.bot.bot import run_bot
+from src.bot.bot import create_dispatcher, run_bot, run_webhook
+from src.bot.middleware import TelegramApiMetricsMiddleware
 from src.core.config import settings
+from src.core.instrumentation import REGISTRY
+from src.core.readiness import Readiness
 from src.moderation.client import ModerationClient, create_http_session
 
 
 async def main() -> None:
     bot = Bot(settings.bot_token)
+    bot.session.middleware(TelegramApiMetricsMiddleware())
     session = await create_http_session()
     moderation_client = ModerationClient(
         base_url=str(settings.api_base),
         session=session,
     )
-    app = create_api_app(bot)
+    REGISTRY.add_collector(moderation_client.export_metrics)
+    readiness = Readiness()
+    dp = create_dispatcher(moderation_client, readiness)
+    app = create_api_app(bot, dp, readiness)
 
     config = uvicorn.Config(
         app=app,
@@ -28,10 +35,14 @@ async def main() -> None:
     api_task = asyncio.create_task(server.serve())
 
     try:
-        await run_bot(bot, moderation_client)
+        if settings.bot_mode == "webhook":
+            await run_webhook(bot, dp, api_task)
+        else:
+            await run_bot(bot, dp)
     finally:
         server.should_exit = True
         await api_task
+        REGISTRY.remove_collector(moderation_client.export_metrics)
         await session.close()
         await bot.session.close()
 
@@ -1,11 +1,96 @@
-from aiogram import Bot
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from aiogram import Bot, Dispatcher
 from fastapi import FastAPI
 
+from src.api.routes.health import router as health_router
+from src.api.routes.instrumentation import router as instrumentation_router
 from src.api.routes.notify import router as notify_router
+from src.api.routes.webhook import telegram_webhook
+from src.api.services.coalescing import NotificationCoalescer
+from src.api.services.delivery import DeliveryScheduler
+from src.api.services.notifications import send_notifications
+from src.api.services.notify_jobs import NotifyJobQueue
+from src.core.config import settings
+from src.core.instrumentation import LoopLagMonitor
+from src.core.readiness import Readiness
+
+
+def create_delivery_scheduler() -> DeliveryScheduler:
+    return DeliveryScheduler(
+        global_rate=settings.notify_global_rate,
+        chat_rate=settings.notify_chat_rate,
+        max_concurrency=settings.notify_max_concurrency,
+        max_retries=settings.notify_max_retries,
+        retry_base_delay=settings.notify_retry_base_delay,
+        max_retry_after=settings.notify_max_retry_after,
+    )
+
+
+def create_notify_coalescer() -> NotificationCoalescer | None:
+    if settings.notify_coalesce_window <= 0:
+        return None
+    return NotificationCoalescer(window=settings.notify_coalesce_window)
+
 
+def create_notify_job_queue(
+    bot: Bot, scheduler: DeliveryScheduler, coalescer: NotificationCoalescer | None = None
+) -> NotifyJobQueue | None:
+    if not settings.notify_jobs_path:
+        return None
 
-def create_api_app(bot: Bot) -> FastAPI:
-    app = FastAPI()
+    async def deliver(moderator_ids: list[int], text: str):
+        return await send_notifications(bot, moderator_ids, text, scheduler, coalescer)
+
+    return NotifyJobQueue(
+        settings.notify_jobs_path,
+        deliver,
+        max_pending=settings.notify_jobs_max_pending,
+        workers=settings.notify_job_workers,
+        ttl=settings.notify_jobs_ttl,
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    queue: NotifyJobQueue | None = app.state.notify_jobs
+    # API и бот работают в одном event loop, поэтому монитор показывает задержки и для хендлеров бота.
+    lag_monitor = LoopLagMonitor(settings.loop_lag_interval) if settings.loop_lag_interval > 0 else None
+    if queue is not None:
+        await queue.start()
+    if lag_monitor is not None:
+        lag_monitor.start()
+    readiness: Readiness = app.state.readiness
+    readiness.set_ready("api")
+    try:
+        yield
+    finally:
+        readiness.set_not_ready("api")
+        if lag_monitor is not None:
+            await lag_monitor.close()
+        if queue is not None:
+            await queue.close()
+
+
+def create_api_app(bot: Bot, dispatcher: Dispatcher | None = None, readiness: Readiness | None = None) -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
     app.state.bot = bot
+    app.state.dispatcher = dispatcher
+    app.state.readiness = readiness if readiness is not None else Readiness()
+    app.state.readiness.require("api")
+    app.state.delivery_scheduler = create_delivery_scheduler()
+    app.state.notify_coalescer = create_notify_coalescer()
+    app.state.notify_jobs = create_notify_job_queue(bot, app.state.delivery_scheduler, app.state.notify_coalescer)
     app.include_router(notify_router, prefix="/api/moderation", tags=["moderation"])
+    app.include_router(instrumentation_router, tags=["instrumentation"])
+    app.include_router(health_router, tags=["health"])
+    if settings.fake_backend:
+        # Импортируем только когда нужен: в проде этот модуль не загружается.
+        from src.api.routes.fake_backend import router as fake_backend_router
+
+        app.include_router(fake_backend_router, prefix="/api", tags=["fake-backend"])
+    if dispatcher is not None and settings.bot_mode == "webhook":
+        settings.require_webhook_secret()
+        app.add_api_route(settings.webhook_path, telegram_webhook, methods=["POST"], tags=["telegram"])
     return app
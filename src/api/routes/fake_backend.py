@@ -0,0 +1,73 @@
+"""
+Минимальная имитация ручек основного backend Vibik для локальной проверки бота.
+
+Подключается при FAKE_BACKEND=true; чтобы бот ходил в неё, укажите API_ENV=local и
+API_BASE_LOCAL=http://localhost:<NOTIFY_PORT>.
+"""
+
+import itertools
+
+from fastapi import APIRouter, HTTPException, Response
+
+from src.moderation.models import BulkDecisionRequest, BulkDecisionResponse, DecisionAction, DecisionResult
+
+router = APIRouter()
+
+_task_ids = itertools.count(1)
+_decisions: dict[int, DecisionAction] = {}
+
+
+@router.get("/moderation/next")
+async def next_task():
+    user_task_id = next(_task_ids)
+    return {
+        "userTaskId": user_task_id,
+        "taskId": f"fake-{user_task_id}",
+        "name": f"Тестовое задание #{user_task_id}",
+        "tags": ["fake"],
+        "extendedInfo": {
+            "description": "Задача из локального fake backend",
+            "photosRequired": 1,
+            "examplePhotos": [],
+            "userPhotos": [f"https://picsum.photos/seed/vibik-{user_task_id}/800/600"],
+        },
+    }
+
+
+@router.get("/moderation/{user_id}/check")
+async def check_moderator(user_id: int) -> bool:
+    return True
+
+
+@router.get("/metrics")
+async def metrics() -> list:
+    return []
+
+
+@router.post("/moderation/bulk")
+async def bulk_decide(payload: BulkDecisionRequest) -> BulkDecisionResponse:
+    return BulkDecisionResponse(results=[_decide(d.userTaskId, d.action) for d in payload.decisions])
+
+
+@router.post("/moderation/{user_task_id}/approve")
+async def approve(user_task_id: int):
+    return _single(user_task_id, DecisionAction.APPROVE)
+
+
+@router.post("/moderation/{user_task_id}/reject")
+async def reject(user_task_id: int):
+    return _single(user_task_id, DecisionAction.REJECT)
+
+
+def _single(user_task_id: int, action: DecisionAction) -> Response:
+    result = _decide(user_task_id, action)
+    if not result.ok:
+        raise HTTPException(status_code=409, detail=result.error)
+    return Response(status_code=200)
+
+
+def _decide(user_task_id: int, action: DecisionAction) -> DecisionResult:
+    previous = _decisions.setdefault(user_task_id, action)
+    if previous != action:
+        return DecisionResult(userTaskId=user_task_id, ok=False, error=f"Задача уже обработана: {previous}")
+    return DecisionResult(userTaskId=user_task_id, ok=True)
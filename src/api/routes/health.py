@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from src.core.readiness import Readiness
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+async def healthz() -> dict[str, str]:
+    """Liveness: процесс жив и event loop отвечает."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz(request: Request) -> JSONResponse:
+    """Readiness: 200, когда все компоненты запущены, иначе 503 со статусом каждого."""
+    readiness: Readiness = request.app.state.readiness
+    status_code = 200 if readiness.ready else 503
+    return JSONResponse(
+        {"status": "ready" if readiness.ready else "not_ready", "components": readiness.status()},
+        status_code=status_code,
+    )
@@ -1,35 +1,61 @@
-import asyncio
-
 from aiogram import Bot
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request
 
-from src.api.schemas.notify import NotifyRequest, NotifyResponse, FailedNotification
-from src.bot.keyboards.common_kb import get_next_kb
+from src.api.schemas.notify import NotifyJobAccepted, NotifyJobStatus, NotifyRequest
+from src.api.services.coalescing import NotificationCoalescer
+from src.api.services.delivery import DeliveryScheduler
+from src.api.services.notifications import send_notifications
+from src.api.services.notify_jobs import QUEUED, NotifyJobQueue, QueueFullError
 from src.bot.texts.common_text import new_task_notification
 
 router = APIRouter()
 
 
-async def _send_notifications(bot: Bot, moderator_ids: list[int], text: str) -> NotifyResponse:
-    tasks = [
-        bot.send_message(chat_id=moderator_id, text=text, reply_markup=get_next_kb) for moderator_id in moderator_ids
-    ]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-
-    failed = []
-    sent = 0
-
-    for moderator_id, result in zip(moderator_ids, results):
-        if isinstance(result, Exception):
-            failed.append(FailedNotification(id=moderator_id, error=str(result)))
-        else:
-            sent += 1
-
-    return NotifyResponse(sent=sent, failed=failed)
-
-
 @router.post("/notify")
 async def notify(payload: NotifyRequest, request: Request):
     bot: Bot = request.app.state.bot
-    result = await _send_notifications(bot, payload.moderator_ids, new_task_notification)
+    scheduler: DeliveryScheduler = request.app.state.delivery_scheduler
+    coalescer: NotificationCoalescer | None = request.app.state.notify_coalescer
+    result = await send_notifications(bot, payload.moderator_ids, new_task_notification, scheduler, coalescer)
     return result
+
+
+@router.get("/notify/stats")
+async def notify_stats(request: Request) -> dict[str, int]:
+    """Сколько уведомлений отправлено новым сообщением, а сколько склеено редактированием."""
+    coalescer: NotificationCoalescer | None = request.app.state.notify_coalescer
+    if coalescer is None:
+        return {"sent": 0, "edited": 0, "edit_fallbacks": 0, "sends_saved": 0}
+    stats = coalescer.stats
+    return {
+        "sent": stats.sent,
+        "edited": stats.edited,
+        "edit_fallbacks": stats.edit_fallbacks,
+        "sends_saved": stats.sends_saved,
+    }
+
+
+@router.post("/notify/jobs", status_code=202)
+async def enqueue_notify(payload: NotifyRequest, request: Request) -> NotifyJobAccepted:
+    """Ставит рассылку в очередь и сразу отвечает 202 с id задачи."""
+    queue = _job_queue(request)
+    try:
+        job_id = await queue.enqueue(payload.moderator_ids, new_task_notification)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return NotifyJobAccepted(job_id=job_id, status=QUEUED)
+
+
+@router.get("/notify/jobs/{job_id}")
+async def notify_job_status(job_id: str, request: Request) -> NotifyJobStatus:
+    job = await _job_queue(request).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _job_queue(request: Request) -> NotifyJobQueue:
+    queue: NotifyJobQueue | None = request.app.state.notify_jobs
+    if queue is None:
+        raise HTTPException(status_code=404, detail="Async notify jobs are disabled")
+    return queue
@@ -0,0 +1,43 @@
+import asyncio
+import secrets
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from fastapi import HTTPException, Request
+
+from src.core.config import settings
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+_background_tasks: set[asyncio.Task[Any]] = set()
+
+
+async def telegram_webhook(request: Request) -> dict:
+    """
+    Принимает апдейт от Telegram и передаёт его в dispatcher.
+
+    Ответ отдаётся сразу, обработка идёт в фоне, чтобы Telegram не ждал хендлеры.
+    """
+    token = request.headers.get(SECRET_HEADER, "")
+    # Пустой секрет сюда не доходит (проверяется при старте), но и с ним пустой заголовок не пропускаем.
+    if not settings.webhook_secret or not secrets.compare_digest(token, settings.webhook_secret):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+
+    bot: Bot = request.app.state.bot
+    dispatcher: Dispatcher = request.app.state.dispatcher
+    update = await request.json()
+
+    task = asyncio.create_task(_feed_update(bot, dispatcher, update))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return {}
+
+
+async def _feed_update(bot: Bot, dispatcher: Dispatcher, update: dict[str, Any]) -> None:
+    try:
+        result = await dispatcher.feed_raw_update(bot=bot, update=update)
+        if isinstance(result, TelegramMethod):
+            await dispatcher.silent_call_request(bot=bot, result=result)
+    except Exception as e:
+        print(f"Error handling webhook update: {e}")
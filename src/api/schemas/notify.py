@@ -13,3 +13,14 @@ class FailedNotification(BaseModel):
 class NotifyResponse(BaseModel):
     sent: int
     failed: list[FailedNotification]
+
+
+class NotifyJobAccepted(BaseModel):
+    job_id: str
+    status: str
+
+
+class NotifyJobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | done
+    result: NotifyResponse | None = None
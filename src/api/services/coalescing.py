@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
+
+@dataclass
+class CoalescingStats:
+    sent: int = 0
+    edited: int = 0
+    edit_fallbacks: int = 0
+
+    @property
+    def sends_saved(self) -> int:
+        return self.edited
+
+
+@dataclass
+class _ChatNotice:
+    message_id: int
+    count: int
+    updated_at: float
+
+
+class NotificationCoalescer:
+    """
+    Склеивает серии уведомлений одному модератору.
+
+    Если предыдущее уведомление в чат было меньше window секунд назад, новое не отправляется,
+    а уже отправленное сообщение редактируется: в нём показывается, сколько новых задач пришло.
+    Каждое следующее уведомление продлевает окно.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: float = 60.0,
+        max_chats: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = window
+        self.max_chats = max(1, max_chats)
+        self.stats = CoalescingStats()
+        self._clock = clock
+        self._notices: OrderedDict[int, _ChatNotice] = OrderedDict()
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    async def notify(
+        self,
+        bot: Bot,
+        chat_id: int,
+        text: str,
+        format_count: Callable[[int], str],
+        reply_markup: Any = None,
+    ) -> Any:
+        # Уведомления одному чату обрабатываются по очереди, иначе два запроса могут оба отправить новое сообщение.
+        async with self._locks.setdefault(chat_id, asyncio.Lock()):
+            return await self._notify(bot, chat_id, text, format_count, reply_markup)
+
+    async def _notify(
+        self,
+        bot: Bot,
+        chat_id: int,
+        text: str,
+        format_count: Callable[[int], str],
+        reply_markup: Any,
+    ) -> Any:
+        now = self._clock()
+        notice = self._notices.get(chat_id)
+        if notice is not None and now - notice.updated_at < self.window:
+            count = notice.count + 1
+            try:
+                # reply_markup не передаём: у редактирования может быть только inline-клавиатура,
+                # а обычная клавиатура, отправленная с первым сообщением, и так остаётся у модератора.
+                result = await bot.edit_message_text(
+                    text=format_count(count),
+                    chat_id=chat_id,
+                    message_id=notice.message_id,
+                )
+            except TelegramBadRequest as e:
+                # Сообщение удалили или его уже нельзя редактировать — отправляем новое. RetryAfter и сетевые
+                # ошибки пробрасываются: их повторяет DeliveryScheduler, иначе новое сообщение ушло бы сразу.
+                print(f"Cannot edit notification in chat {chat_id}, sending a new one: {e!r}")
+                self.stats.edit_fallbacks += 1
+            else:
+                notice.count = count
+                notice.updated_at = now
+                self._notices.move_to_end(chat_id)
+                self.stats.edited += 1
+                return result
+
+        message = await bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
+        self.stats.sent += 1
+        self._remember(chat_id, _ChatNotice(message_id=message.message_id, count=1, updated_at=now))
+        return message
+
+    def _remember(self, chat_id: int, notice: _ChatNotice) -> None:
+        self._notices[chat_id] = notice
+        self._notices.move_to_end(chat_id)
+        now = self._clock()
+        while self._notices:
+            oldest_id, oldest = next(iter(self._notices.items()))
+            if len(self._notices) <= self.max_chats and now - oldest.updated_at < self.window:
+                break
+            del self._notices[oldest_id]
+            lock = self._locks.get(oldest_id)
+            if lock is not None and not lock.locked():
+                del self._locks[oldest_id]
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram.exceptions import RestartingTelegram, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+TRANSIENT_ERRORS = (TelegramNetworkError, TelegramServerError, RestartingTelegram, asyncio.TimeoutError)
+
+
+class RateLimiter:
+    """Token bucket: не больше rate отправок в секунду с запасом burst."""
+
+    def __init__(self, rate: float, burst: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._blocked_until = 0.0
+
+    @property
+    def idle(self) -> bool:
+        now = self._clock()
+        self._refill(now)
+        return self._tokens >= self.burst and self._blocked_until <= now
+
+    async def acquire(self) -> None:
+        while True:
+            now = self._clock()
+            self._refill(now)
+            wait = self._blocked_until - now
+            if wait <= 0:
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Запрещает отправку на seconds секунд (например, по retry_after от Telegram)."""
+        self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+
+@dataclass
+class DeliveryResult:
+    chat_id: int
+    error: str | None = None
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class DeliveryScheduler:
+    """
+    Планировщик рассылки с учётом лимитов Telegram.
+
+    Соблюдает общий и per-chat лимит отправок, выжидает retry_after и повторяет
+    временные ошибки с экспоненциальной задержкой. Один экземпляр должен
+    использоваться всеми запросами, чтобы общий лимит действовал на весь процесс.
+    """
+
+    def __init__(
+        self,
+        *,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        max_concurrency: int = 30,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 30.0,
+        max_retry_after: float = 60.0,
+        max_tracked_chats: int = 10_000,
+    ):
+        self.global_limiter = RateLimiter(global_rate, burst=global_rate)
+        self.chat_rate = chat_rate
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_retry_after = max_retry_after
+        self.max_tracked_chats = max_tracked_chats
+        self._chat_limiters: OrderedDict[int, RateLimiter] = OrderedDict()
+
+    async def deliver(
+        self,
+        chat_ids: Sequence[int],
+        send: Callable[[int], Awaitable[Any]],
+    ) -> list[DeliveryResult]:
+        """Отправляет сообщение в каждый чат через send(chat_id); результаты в порядке chat_ids."""
+        results = [DeliveryResult(chat_id=chat_id) for chat_id in chat_ids]
+        queue: asyncio.Queue[DeliveryResult] = asyncio.Queue()
+        for result in results:
+            queue.put_nowait(result)
+
+        async def worker() -> None:
+            while not queue.empty():
+                await self._deliver_one(queue.get_nowait(), send)
+
+        workers = min(self.max_concurrency, len(results))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def _deliver_one(self, result: DeliveryResult, send: Callable[[int], Awaitable[Any]]) -> None:
+        chat_limiter = self._chat_limiter(result.chat_id)
+        while True:
+            await chat_limiter.acquire()
+            await self.global_limiter.acquire()
+            result.attempts += 1
+            try:
+                await send(result.chat_id)
+                result.error = None
+                return
+            except TelegramRetryAfter as e:
+                result.error = str(e)
+                if result.attempts > self.max_retries or e.retry_after > self.max_retry_after:
+                    return
+                # Flood control в Telegram общий для бота, поэтому притормаживаем всю рассылку.
+                chat_limiter.pause(e.retry_after)
+                self.global_limiter.pause(e.retry_after)
+            except TRANSIENT_ERRORS as e:
+                result.error = str(e) or e.__class__.__name__
+                if result.attempts > self.max_retries:
+                    return
+                await asyncio.sleep(self._backoff(result.attempts))
+            except Exception as e:
+                result.error = str(e)
+                return
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _chat_limiter(self, chat_id: int) -> RateLimiter:
+        limiter = self._chat_limiters.get(chat_id)
+        if limiter is None:
+            limiter = RateLimiter(self.chat_rate)
+            self._chat_limiters[chat_id] = limiter
+            self._evict_idle_limiters()
+        else:
+            self._chat_limiters.move_to_end(chat_id)
+        return limiter
+
+    def _evict_idle_limiters(self) -> None:
+        while len(self._chat_limiters) > self.max_tracked_chats:
+            chat_id, limiter = next(iter(self._chat_limiters.items()))
+            if not limiter.idle:
+                break
+            del self._chat_limiters[chat_id]
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from aiogram import Bot
+
+from src.api.schemas.notify import FailedNotification, NotifyResponse
+from src.api.services.coalescing import NotificationCoalescer
+from src.api.services.delivery import DeliveryScheduler
+from src.bot.keyboards.common_kb import get_next_kb
+from src.bot.texts.common_text import new_tasks_notification
+from src.core.instrumentation import NOTIFY_FAILURES, NOTIFY_FANOUT
+
+
+async def send_notifications(
+    bot: Bot,
+    moderator_ids: list[int],
+    text: str,
+    scheduler: DeliveryScheduler | None = None,
+    coalescer: NotificationCoalescer | None = None,
+) -> NotifyResponse:
+    """Рассылает text модераторам через планировщик доставки (и склейку уведомлений, если она включена)."""
+    scheduler = scheduler or DeliveryScheduler()
+
+    async def send(chat_id: int):
+        if coalescer is not None:
+            return await coalescer.notify(bot, chat_id, text, _format_count, reply_markup=get_next_kb)
+        return await bot.send_message(chat_id=chat_id, text=text, reply_markup=get_next_kb)
+
+    results = await scheduler.deliver(moderator_ids, send)
+
+    failed = []
+    sent = 0
+
+    for result in results:
+        if result.ok:
+            sent += 1
+        else:
+            failed.append(FailedNotification(id=result.chat_id, error=result.error or ""))
+
+    NOTIFY_FANOUT.observe(len(moderator_ids))
+    NOTIFY_FAILURES.inc(len(failed))
+    return NotifyResponse(sent=sent, failed=failed)
+
+
+def _format_count(count: int) -> str:
+    return new_tasks_notification.format(count=count)
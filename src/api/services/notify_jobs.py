@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from src.api.schemas.notify import FailedNotification, NotifyJobStatus, NotifyResponse
+
+T = TypeVar("T")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notify_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    moderator_ids TEXT NOT NULL,
+    text TEXT NOT NULL,
+    result TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+)
+"""
+
+
+class QueueFullError(Exception):
+    """В очереди уже max_pending незавершённых задач."""
+
+
+class NotifyJobQueue:
+    """
+    Долговечная очередь рассылок уведомлений в SQLite.
+
+    Задачи переживают перезапуск: зависшие в статусе running при старте возвращаются в очередь,
+    поэтому доставка «как минимум один раз». Завершённые задачи хранятся ttl секунд.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        deliver: Callable[[list[int], str], Awaitable[NotifyResponse]],
+        *,
+        max_pending: int = 1000,
+        workers: int = 2,
+        ttl: float = 24 * 3600,
+        poll_interval: float = 5.0,
+    ):
+        self.path = path
+        self.deliver = deliver
+        self.max_pending = max_pending
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notify-jobs")
+        self._conn: sqlite3.Connection | None = None
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def start(self) -> None:
+        await self._run(self._requeue_running)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._run(self._close_connection)
+        self._executor.shutdown(wait=True)
+
+    async def enqueue(self, moderator_ids: list[int], text: str) -> str:
+        job_id = uuid.uuid4().hex
+        await self._run(self._insert, job_id, moderator_ids, text)
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> NotifyJobStatus | None:
+        row = await self._run(self._select, job_id)
+        if row is None:
+            return None
+        status, result = row
+        return NotifyJobStatus(
+            job_id=job_id,
+            status=status,
+            result=NotifyResponse.model_validate_json(result) if result else None,
+        )
+
+    async def _worker(self) -> None:
+        while True:
+            # Сбрасываем до выборки, иначе задача, поставленная во время _claim, ждала бы poll_interval.
+            self._wakeup.clear()
+            job = await self._run(self._claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    await self._run(self._delete_expired)
+                continue
+
+            job_id, moderator_ids, text = job
+            try:
+                result = await self.deliver(moderator_ids, text)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error delivering notify job {job_id}: {e}")
+                failed = [FailedNotification(id=moderator_id, error=str(e)) for moderator_id in moderator_ids]
+                result = NotifyResponse(sent=0, failed=failed)
+            await self._run(self._finish, job_id, result.model_dump_json())
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # Методы ниже выполняются только в потоке self._executor.
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS notify_jobs_status ON notify_jobs (status, created_at)")
+            self._conn = conn
+        return self._conn
+
+    def _insert(self, job_id: str, moderator_ids: list[int], text: str) -> None:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (pending,) = conn.execute(
+                "SELECT COUNT(*) FROM notify_jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()
+            if pending >= self.max_pending:
+                raise QueueFullError(f"Notify queue is full ({pending} pending jobs)")
+            conn.execute(
+                "INSERT INTO notify_jobs (id, status, moderator_ids, text, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(moderator_ids), text, time.time()),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _claim(self) -> tuple[str, list[int], str] | None:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, moderator_ids, text FROM notify_jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE notify_jobs SET status = ? WHERE id = ?", (RUNNING, row[0]))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def _finish(self, job_id: str, result: str) -> None:
+        self._connection().execute(
+            "UPDATE notify_jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+            (DONE, result, time.time(), job_id),
+        )
+
+    def _select(self, job_id: str) -> tuple[str, str | None] | None:
+        return self._connection().execute("SELECT status, result FROM notify_jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _requeue_running(self) -> None:
+        self._connection().execute("UPDATE notify_jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+
+    def _delete_expired(self) -> None:
+        self._connection().execute(
+            "DELETE FROM notify_jobs WHERE status = ? AND finished_at < ?", (DONE, time.time() - self.ttl)
+        )
+
+    def _close_connection(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,20 +1,169 @@
+import asyncio
+from functools import partial
+
+import aiohttp
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from src.bot.handlers import metrics, moderator
-from src.bot.middleware import ModerationClientMiddleware, ModeratorAuthMiddleware
+from src.bot.storage import create_fsm_storage
+from src.bot.middleware import (
+    HandlerMetricsMiddleware,
+    ModerationClientMiddleware,
+    ModeratorAuthMiddleware,
+    create_auth_cache,
+)
+from src.core.config import settings
+from src.core.readiness import Readiness
+from src.core.warmup import BackgroundWarmup
+from src.moderation.batching import DecisionBatcher
 from src.moderation.client import ModerationClient
+from src.moderation.duplicates import PhotoDuplicateDetector
+from src.moderation.leases import TaskLeaseRegistry
+from src.moderation.outbox import DecisionOutbox
+from src.moderation.prefetch import TaskPrefetcher
+from src.utilities.chart_pool import ChartRenderPool
+from src.utilities.file_id_cache import FileIdCache
+from src.utilities.metrics_aggregator import RollingMetricsAggregator
+from src.utilities.metrics_rollup import MetricsRollup
+from src.utilities.metrics_store import MetricsEventStore
+from src.utilities.metrics_visualization import get_chart_renderer, warm_up_chart_renderer
+from src.utilities.phash import HashIndex
+from src.utilities.photo_preview import PhotoPreviewer, PreviewDiskCache, download_photo
+
+
+def create_dispatcher(moderation_client: ModerationClient, readiness: Readiness | None = None) -> Dispatcher:
+    storage = create_fsm_storage()
+    dp = Dispatcher(storage=storage)
+    dp.shutdown.register(storage.close)
+
+    if readiness is not None:
+        readiness.require("bot")
+        dp.startup.register(partial(readiness.set_ready, "bot"))
+        dp.shutdown.register(partial(readiness.set_not_ready, "bot"))
+
+    prefetcher = None
+    if settings.prefetch_size > 0:
+        prefetcher = TaskPrefetcher(
+            moderation_client,
+            size=settings.prefetch_size,
+            lease_timeout=settings.prefetch_lease_timeout,
+        )
+        dp.shutdown.register(prefetcher.close)
+
+    task_leases = TaskLeaseRegistry(settings.task_lease_ttl) if settings.task_lease_ttl > 0 else None
+
+    file_id_cache = None
+    if settings.file_id_cache_size > 0:
+        file_id_cache = FileIdCache(settings.file_id_cache_size, settings.file_id_cache_path)
+        dp.shutdown.register(file_id_cache.close)
 
+    photo_previewer = None
+    if settings.photo_preview_size > 0:
+        photo_previewer = PhotoPreviewer(
+            moderation_client.session,
+            PreviewDiskCache(settings.photo_preview_cache_dir, settings.photo_preview_cache_bytes),
+            max_side=settings.photo_preview_size,
+            quality=settings.photo_preview_quality,
+            workers=settings.photo_preview_workers,
+            max_download_bytes=settings.photo_preview_max_download_bytes,
+            timeout=settings.photo_preview_timeout,
+        )
+        dp.shutdown.register(photo_previewer.close)
 
-def create_dispatcher(moderation_client: ModerationClient) -> Dispatcher:
-    dp = Dispatcher(storage=MemoryStorage())
+    duplicate_detector = None
+    if settings.phash_enabled:
+        duplicate_detector = PhotoDuplicateDetector(
+            _photo_fetcher(moderation_client, photo_previewer),
+            HashIndex(settings.phash_index_path),
+            radius=settings.phash_radius,
+            workers=settings.phash_workers,
+        )
+        dp.startup.register(duplicate_detector.start)
+        dp.shutdown.register(duplicate_detector.close)
 
-    client_middleware = ModerationClientMiddleware(moderation_client)
+    get_chart_renderer(settings.chart_renderer)  # опечатка в CHART_RENDERER должна падать при старте, а не на /metrics
+    chart_pool = None
+    if settings.chart_render_workers > 0:
+        chart_pool = ChartRenderPool(
+            max_workers=settings.chart_render_workers,
+            max_concurrency=settings.chart_render_concurrency,
+            timeout=settings.chart_render_timeout,
+            renderer=settings.chart_renderer,
+        )
+        dp.shutdown.register(chart_pool.close)
+
+    metrics_aggregator = RollingMetricsAggregator() if settings.metrics_incremental else None
+    metrics_rollup = None
+    if settings.metrics_rollup_days > 0:
+        metrics_rollup = MetricsRollup(
+            retention_days=settings.metrics_rollup_days,
+            exact_days=settings.metrics_rollup_exact_days,
+        )
+    metrics_store = None
+    if settings.metrics_store_dir:
+        metrics_store = MetricsEventStore(settings.metrics_store_dir)
+        dp.startup.register(_metrics_store_loader(metrics_store, metrics_rollup))
+
+    if settings.warmup_enabled:
+        warmup = BackgroundWarmup(readiness if settings.readiness_requires_warmup else None)
+        if chart_pool is not None:
+            warmup.add("chart_pool", chart_pool.warm_up)
+        else:
+            warmup.add(settings.chart_renderer, partial(warm_up_chart_renderer, settings.chart_renderer))
+        if photo_previewer is not None:
+            warmup.add("photo_previewer", photo_previewer.warm_up)
+        if duplicate_detector is not None:
+            warmup.add("duplicate_detector", duplicate_detector.warm_up)
+        dp.startup.register(warmup.start)
+        dp.shutdown.register(warmup.close)
+
+    decision_batcher = None
+    if settings.decision_batch_window > 0:
+        decision_batcher = DecisionBatcher(
+            moderation_client,
+            window=settings.decision_batch_window,
+            max_batch=settings.decision_batch_size,
+        )
+        dp.shutdown.register(decision_batcher.close)
+
+    decision_outbox = None
+    if settings.decision_write_behind:
+        decision_outbox = DecisionOutbox(
+            settings.decision_outbox_path,
+            moderation_client,
+            max_attempts=settings.decision_outbox_max_attempts,
+            retry_base_delay=settings.decision_outbox_retry_base_delay,
+            batch_size=settings.decision_batch_size,
+        )
+        if task_leases is not None:
+            decision_outbox.on_settled = task_leases.release
+        dp.startup.register(_outbox_starter(decision_outbox))
+        dp.shutdown.register(decision_outbox.close)
+
+    client_middleware = ModerationClientMiddleware(
+        moderation_client,
+        task_prefetcher=prefetcher,
+        task_leases=task_leases,
+        file_id_cache=file_id_cache,
+        photo_previewer=photo_previewer,
+        duplicate_detector=duplicate_detector,
+        chart_pool=chart_pool,
+        metrics_aggregator=metrics_aggregator,
+        metrics_rollup=metrics_rollup,
+        metrics_store=metrics_store,
+        decision_batcher=decision_batcher,
+        decision_outbox=decision_outbox,
+    )
     dp.message.middleware(client_middleware)
     dp.callback_query.middleware(client_middleware)
 
-    dp.message.middleware(ModeratorAuthMiddleware())
-    dp.callback_query.middleware(ModeratorAuthMiddleware())
+    auth_cache = create_auth_cache()
+    dp.message.middleware(ModeratorAuthMiddleware(auth_cache))
+    dp.callback_query.middleware(ModeratorAuthMiddleware(auth_cache))
+
+    handler_metrics = HandlerMetricsMiddleware()
+    dp.message.middleware(handler_metrics)
+    dp.callback_query.middleware(handler_metrics)
 
     dp.include_routers(
         moderator.router,
@@ -24,7 +173,59 @@ def create_dispatcher(moderation_client: ModerationClient) -> Dispatcher:
     return dp
 
 
-async def run_bot(bot: Bot, moderation_client: ModerationClient) -> None:
-    dp = create_dispatcher(moderation_client)
+def _outbox_starter(decision_outbox: DecisionOutbox):
+    async def start(bot: Bot) -> None:
+        decision_outbox.on_failure = partial(moderator.report_failed_decision, bot)
+        await decision_outbox.start()
+
+    return start
+
+
+def _metrics_store_loader(metrics_store: MetricsEventStore, metrics_rollup: MetricsRollup | None):
+    async def load() -> None:
+        metrics_store.load()
+        if metrics_rollup is not None:
+            # Дневные агрегаты живут в памяти, поэтому после перезапуска восстанавливаем их из хранилища.
+            metrics_rollup.ingest_columns(metrics_store.scan())
+        print(f"Metrics store loaded: {len(metrics_store)} events, {len(metrics_store.usernames)} users")
+
+    return load
+
+
+def _photo_fetcher(moderation_client: ModerationClient, photo_previewer: PhotoPreviewer | None):
+    """Если включены превью, хэшируем их (они уже скачаны и закэшированы), иначе скачиваем оригинал."""
+    if photo_previewer is not None:
+        return photo_previewer.preview
+
+    timeout = aiohttp.ClientTimeout(total=settings.photo_preview_timeout)
+
+    async def fetch(url: str) -> bytes:
+        return await download_photo(
+            moderation_client.session, url, max_bytes=settings.photo_preview_max_download_bytes, timeout=timeout
+        )
+
+    return fetch
+
+
+async def run_bot(bot: Bot, dp: Dispatcher) -> None:
     await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot)
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher, server_task: asyncio.Task) -> None:
+    """
+    Регистрирует webhook и работает, пока жив API-сервер, который принимает апдейты.
+
+    Webhook при остановке не удаляется: за балансировщиком могут продолжать работать другие реплики.
+    """
+    secret = settings.require_webhook_secret()
+    await dp.emit_startup(bot=bot)
+    try:
+        await bot.set_webhook(
+            settings.webhook_url,
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        await asyncio.shield(server_task)
+    finally:
+        await dp.emit_shutdown(bot=bot)
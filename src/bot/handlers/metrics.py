@@ -1,42 +1,152 @@
+import time
+from datetime import datetime, timedelta, timezone
+
 from aiogram import Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import BufferedInputFile, Message
 
 from src.bot.keyboards.common_kb import get_next_kb
+from src.core.config import settings
 from src.moderation.client import ModerationClient
+from src.utilities.chart_pool import ChartRenderPool
+from src.utilities.metrics_aggregator import RollingMetricsAggregator
+from src.utilities.metrics_columnar import MetricsColumns, aggregate_columns
+from src.utilities.metrics_rollup import Granularity, MetricsRollup
+from src.utilities.metrics_store import MetricsEventStore
 from src.utilities.metrics_visualization import (
-    build_metrics_visualization,
     format_average_time,
     format_duration_minutes,
+    format_percentiles,
+    render_chart,
 )
 
 router = Router(name=__name__)
 
+DEFAULT_BUCKETS = {Granularity.DAY: 7, Granularity.WEEK: 4, Granularity.MONTH: 3}
+MAX_BUCKETS = {Granularity.DAY: 62, Granularity.WEEK: 52, Granularity.MONTH: 13}
+PERIOD_UNITS = {Granularity.DAY: "дн.", Granularity.WEEK: "нед.", Granularity.MONTH: "мес."}
+# Сколько дней истории из локального хранилища нужно сводке и диаграмме /metrics без аргументов.
+STORE_SCAN_DAYS = 35
+USAGE = "Использование: /metrics [day|week|month] [N], например /metrics day 14 или /metrics month 6"
+
+
+def parse_period(args: str | None) -> tuple[Granularity, int] | None:
+    """Разбирает аргументы /metrics; None — период по умолчанию. Бросает ValueError на неверный ввод."""
+    if not args or not args.split():
+        return None
+    parts = args.split()
+    if len(parts) > 2:
+        raise ValueError(args)
+    granularity = Granularity(parts[0].lower())
+    buckets = int(parts[1]) if len(parts) == 2 else DEFAULT_BUCKETS[granularity]
+    if not 1 <= buckets <= MAX_BUCKETS[granularity]:
+        raise ValueError(f"N must be between 1 and {MAX_BUCKETS[granularity]}")
+    return granularity, buckets
+
 
 @router.message(Command("metrics"))
-async def metrics_handler(message: Message, moderation_client: ModerationClient) -> None:
+async def metrics_handler(
+    message: Message,
+    moderation_client: ModerationClient,
+    command: CommandObject | None = None,
+    chart_pool: ChartRenderPool | None = None,
+    metrics_aggregator: RollingMetricsAggregator | None = None,
+    metrics_rollup: MetricsRollup | None = None,
+    metrics_store: MetricsEventStore | None = None,
+) -> None:
     try:
-        metrics = await moderation_client.metrics()
+        period = parse_period(command.args if command is not None else None)
+    except ValueError:
+        await message.answer(USAGE)
+        return
+
+    try:
+        metrics = await _load_metrics(moderation_client, metrics_store)
     except Exception as exc:  # pragma: no cover - сеть/апи
         print(f"Error loading metrics: {exc}")
         await message.answer("Не удалось получить метрики, попробуйте позже.")
         return
 
-    if metrics is None or len(metrics.root) == 0:
-        await message.answer("Метрик за последнюю неделю пока нет.", reply_markup=get_next_kb)
-        return
+    # Индекс пополняется при каждом /metrics, чтобы история копилась и для запросов без аргументов.
+    if metrics_rollup is not None and metrics is not None:
+        metrics_rollup.ingest_columns(metrics)
 
-    visualization = build_metrics_visualization(metrics.root)
-    summary = visualization.summary
+    if period is not None:
+        granularity, buckets = period
+        rollup = metrics_rollup
+        if rollup is None:
+            rollup = MetricsRollup()
+            history = metrics_store.scan() if metrics_store is not None else metrics
+            if history is not None:
+                rollup.ingest_columns(history)
+        aggregate = rollup.aggregate(granularity, buckets)
+        if aggregate.summary.submit_count == 0 and aggregate.summary.change_count == 0:
+            await message.answer("Метрик за выбранный период пока нет.", reply_markup=get_next_kb)
+            return
+        header = f"Метрики за последние {buckets} {PERIOD_UNITS[granularity]}:\n"
+        chart_caption = f"График: последние {buckets} {PERIOD_UNITS[granularity]}"
+    else:
+        if metrics is None or len(metrics) == 0:
+            await message.answer("Метрик за последнюю неделю пока нет.", reply_markup=get_next_kb)
+            return
 
-    caption = (
-        "Метрики за последнюю неделю:\n"
+        if metrics_aggregator is not None:
+            metrics_aggregator.ingest_columns(metrics)
+            aggregate = metrics_aggregator.snapshot()
+        else:
+            aggregate = aggregate_columns(metrics)
+        header = "Метрики за последнюю неделю:\n"
+        chart_caption = "График: последние 4 недели (по неделям)"
+    summary = aggregate.summary
+
+    summary_text = header + (
         f"• Среднее сдач на пользователя: {summary.average_submissions_per_user:.2f}\n"
         f"• Замены от сдач: {summary.change_percent:.1f}%\n"
         f"• Среднее время сдачи (время суток): {format_average_time(summary.average_submit_minutes)}\n"
         f"• Среднее время между сдачами (ч/мин): {format_duration_minutes(summary.average_between_submits_minutes)}\n"
+        f"• Время сдачи p50/p90/p99: {format_percentiles(summary.submit_minutes_percentiles, format_average_time)}\n"
+        f"• Между сдачами p50/p90/p99: "
+        f"{format_percentiles(summary.between_submits_percentiles, format_duration_minutes)}\n"
         f"• Всего сдач: {summary.submit_count}, замен: {summary.change_count}, пользователей: {summary.user_count}\n"
-        "График: последние 4 недели (по неделям)"
     )
-    photo = BufferedInputFile(visualization.image_bytes, filename=visualization.filename)
+    try:
+        if chart_pool is not None:
+            image_bytes = await chart_pool.render(aggregate.chart)
+        else:
+            image_bytes = render_chart(aggregate.chart, settings.chart_renderer)
+    except Exception as exc:
+        print(f"Error rendering metrics chart: {exc!r}")
+        await message.answer(summary_text + "График построить не удалось", reply_markup=get_next_kb)
+        return
+
+    caption = summary_text + chart_caption
+    photo = BufferedInputFile(image_bytes, filename="metrics.png")
     await message.answer_photo(photo, caption=caption, reply_markup=get_next_kb)
+
+
+async def _load_metrics(
+    moderation_client: ModerationClient, metrics_store: MetricsEventStore | None
+) -> MetricsColumns | None:
+    """
+    Метрики для /metrics. С локальным хранилищем backend опрашивается не чаще раза в metrics_store_refresh
+    секунд: новые события дописываются в хранилище, а ответ собирается выборкой из него.
+    """
+    if metrics_store is None:
+        return await moderation_client.metrics_columns()
+
+    synced_at = metrics_store.synced_at
+    if synced_at is None or time.monotonic() - synced_at >= settings.metrics_store_refresh:
+        try:
+            fetched = await moderation_client.metrics_columns()
+        except Exception as exc:
+            if not len(metrics_store):
+                raise
+            print(f"Error loading metrics, using local store: {exc}")
+        else:
+            if fetched is not None:
+                metrics_store.append_columns(fetched)
+            else:
+                metrics_store.synced_at = time.monotonic()
+
+    start = datetime.now(timezone.utc) - timedelta(days=STORE_SCAN_DAYS)
+    return metrics_store.scan(start)
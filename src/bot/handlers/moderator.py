@@ -1,20 +1,60 @@
-from aiogram import F, Router
+import asyncio
+
+from aiogram import Bot, F, Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, InaccessibleMessage, InputMediaDocument, Message, ReactionTypeEmoji
+from aiogram.types import (
+    BufferedInputFile,
+    CallbackQuery,
+    InaccessibleMessage,
+    InputMediaDocument,
+    InputMediaPhoto,
+    Message,
+    ReactionTypeEmoji,
+)
 
 from src.bot.keyboards.common_kb import create_moderator_kb, get_next_kb
 from src.bot.states import moderator_state
 from src.bot.states.actions import Actions
 from src.bot.texts.common_text import next_photo
-from src.bot.texts.moderation_text import photo_info
+from src.bot.texts.moderation_text import (
+    decision_action_names,
+    decision_conflict,
+    decision_conflicts,
+    duplicate_of_example,
+    duplicate_of_task,
+    duplicates_header,
+    failed_approve,
+    failed_reject,
+    original_photos,
+    photo_info,
+    tasks_taken_by_others,
+)
+from src.core.config import settings
+from src.core.instrumentation import TASK_REFETCHES
+from src.moderation.batching import DecisionBatcher
 from src.moderation.client import ModerationClient
+from src.moderation.duplicates import PhotoDuplicateDetector
+from src.moderation.leases import TaskLeaseRegistry
+from src.moderation.models import Decision, DecisionAction, DecisionResult, ModerationTask
+from src.moderation.outbox import DecisionOutbox, OutboxEntry
+from src.moderation.prefetch import TaskPrefetcher
+from src.utilities.file_id_cache import FileIdCache
+from src.utilities.phash import HashKind
+from src.utilities.photo_preview import PhotoPreviewer
 
 router = Router(name=__name__)
 
 join_to_event_prefix = "join_to_event-"
 join_to_event_postfix = "end_invitation"
 
+SELECTED_TASKS_KEY = "selected_tasks"
+ORIGINAL_PHOTOS_KEY = "original_photos"
+MAX_REMEMBERED_ORIGINALS = 20
+ALBUM_SIZE = 10
+MAX_DUPLICATE_LINES = 5
+
 
 async def set_reaction(message: Message) -> None:
     """
@@ -42,37 +82,186 @@ async def start_handler(message: Message, state: FSMContext) -> None:
 
 @router.message(F.text == next_photo)
 @router.message(Command("next_photo"))
-async def show_next_photo(message: Message, moderation_client: ModerationClient):
+async def show_next_photo(
+    message: Message,
+    state: FSMContext,
+    moderation_client: ModerationClient,
+    task_prefetcher: TaskPrefetcher | None = None,
+    task_leases: TaskLeaseRegistry | None = None,
+    file_id_cache: FileIdCache | None = None,
+    photo_previewer: PhotoPreviewer | None = None,
+    duplicate_detector: PhotoDuplicateDetector | None = None,
+):
+    duplicates_note: asyncio.Task[str] | None = None
     try:
-        task = await moderation_client.next()
+        holder = message.from_user.id if message.from_user is not None else message.chat.id
+        task, leased_by_others = await _next_task(moderation_client, task_prefetcher, task_leases, holder)
         print(task)
 
         if task is None:
-            await message.answer("Нет фотографий для модерации")
+            await message.answer(tasks_taken_by_others if leased_by_others else "Нет фотографий для модерации")
             return
 
         text = photo_info.format(task.name, task.extendedInfo.description, ", ".join(map(str, task.tags)))
-        media: list[InputMediaDocument] = []
+        if duplicate_detector is not None:
+            # Дубликаты ищутся параллельно с отправкой альбома и дописываются в подпись, когда найдены.
+            duplicates_note = asyncio.create_task(_duplicates_note(duplicate_detector, task))
+        urls = [str(p) for p in task.extendedInfo.userPhotos or []]
         a = None
-        for i, p in enumerate(task.extendedInfo.userPhotos or []):
-            url = str(p)
-            if i != 0 and i % 10 == 0:
-                a = await send_with_repl(a, media, message)
-                media = []
-            media.append(InputMediaDocument(media=url, caption=text if i % 10 == 0 else None))
-
-        a = await send_with_repl(a, media, message)
+        if photo_previewer is not None and urls:
+            a = await send_previews(urls, text, message, photo_previewer)
+        has_originals = a is not None
+        if a is None:
+            for start in range(0, max(len(urls), 1), ALBUM_SIZE):
+                a = await send_documents(a, urls[start : start + ALBUM_SIZE], text, message, file_id_cache)
+        else:
+            await _remember_originals(state, task.userTaskId, urls)
+        # Хотя бы один альбом отправлен всегда: документами цикл выполняется минимум один раз.
+        assert a is not None
 
         print(a[0].message_id)
-        kb = create_moderator_kb(task.userTaskId)
+        kb = create_moderator_kb(
+            task.userTaskId,
+            selectable=settings.moderation_multi_select,
+            originals=has_originals,
+        )
         await message.answer("Действие с задачей:", reply_markup=kb, reply_to_message_id=a[0].message_id)
+        if duplicates_note is not None:
+            await _append_duplicates_note(a[0], await duplicates_note)
 
     except Exception as e:
         await message.answer(f"Ошибка при получении фото: {e}")
         print(f"Error in show_next_photo: {e}")
+    finally:
+        if duplicates_note is not None and not duplicates_note.done():
+            duplicates_note.cancel()
+
+
+async def _next_task(
+    moderation_client: ModerationClient,
+    task_prefetcher: TaskPrefetcher | None,
+    task_leases: TaskLeaseRegistry | None,
+    holder: int,
+) -> tuple[ModerationTask | None, bool]:
+    """
+    Следующая задача, которую можно взять в аренду holder.
+
+    Задачи, уже показанные другим модераторам, пропускаются, и запрашивается следующая — не больше
+    task_lease_max_refetch раз. Второй элемент — были ли пропущены чужие задачи.
+    """
+    leased_by_others = False
+    for attempt in range(settings.task_lease_max_refetch + 1):
+        if attempt:
+            TASK_REFETCHES.inc()
+        if task_prefetcher is not None:
+            task = await task_prefetcher.next()
+        else:
+            task = await moderation_client.next()
+        if task is None or task_leases is None:
+            return task, leased_by_others
+        # В режиме выбора модератор копит несколько задач, иначе новая задача освобождает прежнюю.
+        if task_leases.acquire(task.userTaskId, holder, keep_others=settings.moderation_multi_select):
+            return task, leased_by_others
+        print(f"Task {task.userTaskId} is already leased, fetching another one")
+        leased_by_others = True
+    return None, leased_by_others
+
+
+async def _duplicates_note(duplicate_detector: PhotoDuplicateDetector, task: ModerationTask) -> str:
+    """Строки для подписи о возможных дубликатах; при ошибке или таймауте — пустая строка."""
+    try:
+        duplicates = await asyncio.wait_for(duplicate_detector.find_duplicates(task), settings.phash_timeout)
+    except Exception as e:
+        print(f"Error finding duplicates for task {task.userTaskId}: {e!r}")
+        return ""
+    if not duplicates:
+        return ""
+
+    lines = [duplicates_header]
+    for i, match in sorted(duplicates.items())[:MAX_DUPLICATE_LINES]:
+        template = duplicate_of_example if match.kind == HashKind.EXAMPLE else duplicate_of_task
+        lines.append(template.format(photo=i + 1, task=match.ref, distance=match.distance))
+    return "\n".join(lines)
+
+
+async def _append_duplicates_note(album_message: Message, note: str) -> None:
+    """Дописывает строки о дубликатах в подпись уже отправленного альбома."""
+    if not note:
+        return
+    caption = album_message.caption + note if album_message.caption else note.strip()
+    try:
+        await album_message.edit_caption(caption=caption)
+    except Exception as e:
+        print(f"Error adding duplicates note to message {album_message.message_id}: {e!r}")
 
 
-async def send_with_repl(a, media, message):
+async def send_previews(
+    urls: list[str], caption: str, message: Message, photo_previewer: PhotoPreviewer
+) -> list[Message] | None:
+    """
+    Отправляет уменьшенные превью фото альбомами.
+
+    Если хотя бы одно превью не получилось, возвращает None — тогда фото отправляются документами по URL,
+    потому что фото и документы нельзя смешивать в одном альбоме.
+    """
+    previews = await photo_previewer.previews(urls)
+    if any(preview is None for preview in previews):
+        return None
+
+    a = None
+    for start in range(0, len(previews), ALBUM_SIZE):
+        media = [
+            InputMediaPhoto(
+                media=BufferedInputFile(preview, filename=f"photo_{start + i + 1}.jpg"),
+                caption=caption if start + i == 0 else None,
+            )
+            for i, preview in enumerate(previews[start : start + ALBUM_SIZE])
+            if preview is not None
+        ]
+        a = await send_with_repl(a, media, message)
+    return a
+
+
+async def send_documents(
+    a,
+    urls: list[str],
+    caption: str,
+    message: Message,
+    file_id_cache: FileIdCache | None,
+    *,
+    use_cached: bool = True,
+) -> list[Message]:
+    """
+    Отправляет альбом документов, подставляя file_id из кэша вместо URL.
+
+    Если Telegram не принял закэшированный file_id, URL из альбома удаляются из кэша
+    и альбом отправляется заново по исходным ссылкам.
+    """
+    cache = file_id_cache if use_cached else None
+    media = [
+        InputMediaDocument(
+            media=(cache.get(url) if cache is not None else None) or url,
+            caption=caption if i == 0 else None,
+        )
+        for i, url in enumerate(urls)
+    ]
+    try:
+        a = await send_with_repl(a, media, message)
+    except TelegramBadRequest:
+        if file_id_cache is None or all(item.media == url for item, url in zip(media, urls)):
+            raise
+        for url in urls:
+            file_id_cache.invalidate(url)
+        return await send_documents(a, urls, caption, message, file_id_cache, use_cached=False)
+
+    if file_id_cache is not None:
+        for url, sent in zip(urls, a):
+            if sent.document is not None:
+                file_id_cache.put(url, sent.document.file_id)
+    return a
+
+
+async def send_with_repl(a: list[Message] | None, media: list, message: Message) -> list[Message]:
     if a is None:
         a = await message.answer_media_group(media=media)
     else:
@@ -86,17 +275,34 @@ async def approve_handler(
     callback_data: moderator_state.ModeratorFactory,
     state: FSMContext,
     moderation_client: ModerationClient,
+    decision_batcher: DecisionBatcher | None = None,
+    decision_outbox: DecisionOutbox | None = None,
+    task_leases: TaskLeaseRegistry | None = None,
+    task_prefetcher: TaskPrefetcher | None = None,
 ) -> None:
+    queued = False
     try:
-        success = await moderation_client.approve(callback_data.user_task_id)
-        if success:
+        result = await _decide(
+            moderation_client,
+            decision_batcher,
+            callback_data.user_task_id,
+            DecisionAction.APPROVE,
+            decision_outbox=decision_outbox,
+            chat_id=callback.from_user.id,
+        )
+        queued = decision_outbox is not None
+        if result.ok:
+            if task_prefetcher is not None:
+                task_prefetcher.discard(callback_data.user_task_id)
             await callback.answer("Фото одобрено ✅")
         else:
-            await callback.answer("Ошибка при одобрении фото ❌")
+            await callback.answer(result.error or "Ошибка при одобрении фото ❌")
     except Exception as e:
         await callback.answer(f"Ошибка: {e}")
         print(f"Error in approve_handler: {e}")
     finally:
+        # Сообщение с кнопками удаляется в любом случае, поэтому даже после ошибки задачу можно отдать другому.
+        _finish_lease(task_leases, callback_data.user_task_id, queued)
         await _delete_related_messages(callback.message)
 
 
@@ -106,20 +312,223 @@ async def reject_handler(
     callback_data: moderator_state.ModeratorFactory,
     state: FSMContext,
     moderation_client: ModerationClient,
+    decision_batcher: DecisionBatcher | None = None,
+    decision_outbox: DecisionOutbox | None = None,
+    task_leases: TaskLeaseRegistry | None = None,
+    task_prefetcher: TaskPrefetcher | None = None,
 ) -> None:
+    queued = False
     try:
-        success = await moderation_client.reject(callback_data.user_task_id)
-        if success:
+        result = await _decide(
+            moderation_client,
+            decision_batcher,
+            callback_data.user_task_id,
+            DecisionAction.REJECT,
+            decision_outbox=decision_outbox,
+            chat_id=callback.from_user.id,
+        )
+        queued = decision_outbox is not None
+        if result.ok:
+            if task_prefetcher is not None:
+                task_prefetcher.discard(callback_data.user_task_id)
             await callback.answer("Фото отклонено ❌")
         else:
-            await callback.answer("Ошибка при отклонении фото ❌")
+            await callback.answer(result.error or "Ошибка при отклонении фото ❌")
     except Exception as e:
         await callback.answer(f"Ошибка: {e}")
         print(f"Error in reject_handler: {e}")
     finally:
+        _finish_lease(task_leases, callback_data.user_task_id, queued)
         await _delete_related_messages(callback.message, delete_reply=False)
 
 
+@router.callback_query(moderator_state.ModeratorFactory.filter(F.action == Actions.SHOW_ORIGINALS))
+async def show_originals_handler(
+    callback: CallbackQuery,
+    callback_data: moderator_state.ModeratorFactory,
+    state: FSMContext,
+    file_id_cache: FileIdCache | None = None,
+) -> None:
+    """Присылает оригиналы фото задачи документами (по умолчанию отправляются уменьшенные превью)."""
+    message = callback.message
+    data = await state.get_data()
+    urls = data.get(ORIGINAL_PHOTOS_KEY, {}).get(str(callback_data.user_task_id))
+    if not isinstance(message, Message) or not urls:
+        await callback.answer("Оригиналы недоступны")
+        return
+
+    await callback.answer("Отправляю оригиналы…")
+    try:
+        a = None
+        for start in range(0, len(urls), ALBUM_SIZE):
+            a = await send_documents(a, urls[start : start + ALBUM_SIZE], original_photos, message, file_id_cache)
+    except Exception as e:
+        await message.answer(f"Ошибка при отправке оригиналов: {e}")
+        print(f"Error in show_originals_handler: {e}")
+
+
+@router.callback_query(moderator_state.ModeratorFactory.filter(F.action == Actions.TOGGLE_SELECT))
+async def toggle_select_handler(
+    callback: CallbackQuery,
+    callback_data: moderator_state.ModeratorFactory,
+    state: FSMContext,
+) -> None:
+    message = callback.message
+    if not isinstance(message, Message):
+        await callback.answer("Сообщение с задачей недоступно")
+        return
+
+    data = await state.get_data()
+    selected: dict[str, dict] = dict(data.get(SELECTED_TASKS_KEY, {}))
+    key = str(callback_data.user_task_id)
+    is_selected = key not in selected
+    if is_selected:
+        reply = message.reply_to_message
+        selected[key] = {
+            "message_id": message.message_id,
+            "reply_to": reply.message_id if isinstance(reply, Message) else None,
+        }
+    else:
+        del selected[key]
+    await state.update_data({SELECTED_TASKS_KEY: selected})
+
+    kb = create_moderator_kb(
+        callback_data.user_task_id,
+        selectable=True,
+        selected=is_selected,
+        originals=key in data.get(ORIGINAL_PHOTOS_KEY, {}),
+    )
+    await message.edit_reply_markup(reply_markup=kb)
+    await callback.answer(f"Выбрано задач: {len(selected)}")
+
+
+@router.callback_query(
+    moderator_state.ModeratorFactory.filter(F.action.in_({Actions.APPROVE_SELECTED, Actions.REJECT_SELECTED}))
+)
+async def decide_selected_handler(
+    callback: CallbackQuery,
+    callback_data: moderator_state.ModeratorFactory,
+    state: FSMContext,
+    moderation_client: ModerationClient,
+    decision_batcher: DecisionBatcher | None = None,
+    decision_outbox: DecisionOutbox | None = None,
+    task_leases: TaskLeaseRegistry | None = None,
+    task_prefetcher: TaskPrefetcher | None = None,
+) -> None:
+    """Одобряет или отклоняет все выбранные задачи одним действием."""
+    action = DecisionAction.APPROVE if callback_data.action == Actions.APPROVE_SELECTED else DecisionAction.REJECT
+    data = await state.get_data()
+    selected: dict[str, dict] = data.get(SELECTED_TASKS_KEY, {})
+    if not selected:
+        await callback.answer("Сначала выберите задачи")
+        return
+
+    decisions = [Decision(userTaskId=int(key), action=action) for key in selected]
+    conflicts = 0
+    try:
+        if decision_outbox is not None:
+            # Решения сохранены и будут отправлены в фоне; задачи, уже стоящие в outbox с тем же действием,
+            # тоже считаем принятыми, а с другим — нет.
+            stored = await decision_outbox.enqueue_many(decisions, callback.from_user.id)
+            results = [_outbox_result(d.userTaskId, d.action, kept) for d, kept in zip(decisions, stored)]
+            conflicts = sum(1 for kept in stored if kept != action)
+        elif decision_batcher is not None:
+            results = await decision_batcher.submit_many(decisions)
+        else:
+            results = await moderation_client.bulk_decide(decisions)
+    except Exception as e:
+        await callback.answer(f"Ошибка: {e}")
+        print(f"Error in decide_selected_handler: {e}")
+        return
+
+    succeeded = {str(result.userTaskId) for result in results if result.ok}
+    if task_prefetcher is not None:
+        for key in succeeded:
+            task_prefetcher.discard(int(key))
+    if task_leases is not None:
+        if decision_outbox is not None:
+            # Все решения лежат в outbox (и при конфликте — ранее нажатое), аренду снимет он после отправки.
+            for decision in decisions:
+                task_leases.hold_decided(decision.userTaskId)
+        else:
+            for key in succeeded:
+                task_leases.release(int(key))
+    # Неудачные задачи остаются выбранными, чтобы их можно было отправить ещё раз.
+    await state.update_data({SELECTED_TASKS_KEY: {k: v for k, v in selected.items() if k not in succeeded}})
+    verb = "Одобрено" if action == DecisionAction.APPROVE else "Отклонено"
+    text = f"{verb}: {len(succeeded)} из {len(results)}"
+    if conflicts:
+        text += "\n" + decision_conflicts.format(count=conflicts)
+    await callback.answer(text)
+
+    message_ids: list[int] = []
+    for key in succeeded:
+        message_ids.append(selected[key]["message_id"])
+        if action == DecisionAction.APPROVE and selected[key]["reply_to"] is not None:
+            message_ids.append(selected[key]["reply_to"])
+    if message_ids and callback.bot is not None and callback.message is not None:
+        try:
+            await callback.bot.delete_messages(chat_id=callback.message.chat.id, message_ids=message_ids)
+        except Exception as e:
+            print(f"Error deleting decided tasks: {e}")
+
+
+async def _decide(
+    moderation_client: ModerationClient,
+    decision_batcher: DecisionBatcher | None,
+    user_task_id: int,
+    action: DecisionAction,
+    *,
+    decision_outbox: DecisionOutbox | None = None,
+    chat_id: int | None = None,
+) -> DecisionResult:
+    if decision_outbox is not None:
+        # Write-behind: решение сохранено и будет отправлено в фоне; о неудаче модератору сообщит outbox.
+        stored = await decision_outbox.enqueue(user_task_id, action, chat_id)
+        return _outbox_result(user_task_id, action, stored)
+    if decision_batcher is not None:
+        return await decision_batcher.submit(user_task_id, action)
+    ok = await moderation_client.decide(Decision(userTaskId=user_task_id, action=action))
+    return DecisionResult(userTaskId=user_task_id, ok=ok)
+
+
+def _finish_lease(task_leases: TaskLeaseRegistry | None, user_task_id: int, queued: bool) -> None:
+    """Снимает аренду после решения; решение из outbox backend ещё не видел, и аренду снимет outbox."""
+    if task_leases is None:
+        return
+    if queued:
+        task_leases.hold_decided(user_task_id)
+    else:
+        task_leases.release(user_task_id)
+
+
+def _outbox_result(user_task_id: int, action: DecisionAction, stored: DecisionAction) -> DecisionResult:
+    """Решение принято, только если в outbox по задаче лежит именно оно, а не ранее нажатое другое."""
+    if stored == action:
+        return DecisionResult(userTaskId=user_task_id, ok=True)
+    error = decision_conflict.format(task=user_task_id, action=decision_action_names[stored.value])
+    return DecisionResult(userTaskId=user_task_id, ok=False, error=error)
+
+
+async def report_failed_decision(bot: Bot, entry: OutboxEntry, error: str) -> None:
+    """Сообщает модератору, что отложенное решение так и не удалось отправить."""
+    if entry.chat_id is None:
+        return
+    template = failed_approve if entry.action == DecisionAction.APPROVE else failed_reject
+    await bot.send_message(chat_id=entry.chat_id, text=template.format(task=entry.user_task_id, error=error))
+
+
+async def _remember_originals(state: FSMContext, user_task_id: int, urls: list[str]) -> None:
+    """Запоминает URL оригиналов для кнопки «Оригиналы»; хранятся только последние задачи."""
+    data = await state.get_data()
+    originals: dict[str, list[str]] = dict(data.get(ORIGINAL_PHOTOS_KEY, {}))
+    originals.pop(str(user_task_id), None)
+    originals[str(user_task_id)] = urls
+    while len(originals) > MAX_REMEMBERED_ORIGINALS:
+        del originals[next(iter(originals))]
+    await state.update_data({ORIGINAL_PHOTOS_KEY: originals})
+
+
 async def _delete_related_messages(
     message: Message | InaccessibleMessage | None,
     *,
@@ -5,7 +5,18 @@ from aiogram.types.reply_keyboard_markup import ReplyKeyboardMarkup
 
 from src.bot.states.actions import Actions
 from src.bot.states.moderator_state import ModeratorFactory
-from src.bot.texts.common_text import approve, cancel, next_photo, ok, reject
+from src.bot.texts.common_text import (
+    approve,
+    approve_selected,
+    cancel,
+    next_photo,
+    ok,
+    reject,
+    reject_selected,
+    select_task,
+    selected_task,
+    show_originals,
+)
 
 ok_kb: InlineKeyboardMarkup = InlineKeyboardMarkup(
     inline_keyboard=[
@@ -30,21 +41,52 @@ cancel_kb: InlineKeyboardMarkup = InlineKeyboardMarkup(
 )
 
 
-def create_moderator_kb(user_task_id):
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
+def create_moderator_kb(
+    user_task_id, *, selectable: bool = False, selected: bool = False, originals: bool = False
+):
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text=approve,
+                callback_data=ModeratorFactory(action=Actions.APPROVE_PHOTO, user_task_id=user_task_id).pack(),
+            ),
+            InlineKeyboardButton(
+                text=reject,
+                callback_data=ModeratorFactory(action=Actions.REJECT_PHOTO, user_task_id=user_task_id).pack(),
+            ),
+        ]
+    ]
+    if originals:
+        keyboard.append(
             [
                 InlineKeyboardButton(
-                    text=approve,
-                    callback_data=ModeratorFactory(action=Actions.APPROVE_PHOTO, user_task_id=user_task_id).pack(),
+                    text=show_originals,
+                    callback_data=ModeratorFactory(action=Actions.SHOW_ORIGINALS, user_task_id=user_task_id).pack(),
+                )
+            ]
+        )
+    if selectable:
+        keyboard.append(
+            [
+                InlineKeyboardButton(
+                    text=selected_task if selected else select_task,
+                    callback_data=ModeratorFactory(action=Actions.TOGGLE_SELECT, user_task_id=user_task_id).pack(),
+                )
+            ]
+        )
+        keyboard.append(
+            [
+                InlineKeyboardButton(
+                    text=approve_selected,
+                    callback_data=ModeratorFactory(action=Actions.APPROVE_SELECTED, user_task_id=user_task_id).pack(),
                 ),
                 InlineKeyboardButton(
-                    text=reject,
-                    callback_data=ModeratorFactory(action=Actions.REJECT_PHOTO, user_task_id=user_task_id).pack(),
+                    text=reject_selected,
+                    callback_data=ModeratorFactory(action=Actions.REJECT_SELECTED, user_task_id=user_task_id).pack(),
                 ),
             ]
-        ]
-    )
+        )
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
 get_next_kb: ReplyKeyboardMarkup = ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text=next_photo)]])
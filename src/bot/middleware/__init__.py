@@ -1,7 +1,11 @@
-from .auth import ModeratorAuthMiddleware
+from .auth import ModeratorAuthMiddleware, create_auth_cache
+from .instrumentation import HandlerMetricsMiddleware, TelegramApiMetricsMiddleware
 from .moderation_client import ModerationClientMiddleware
 
 __all__ = [
+    "HandlerMetricsMiddleware",
     "ModerationClientMiddleware",
     "ModeratorAuthMiddleware",
+    "TelegramApiMetricsMiddleware",
+    "create_auth_cache",
 ]
@@ -5,12 +5,24 @@ from aiogram import BaseMiddleware
 from aiogram.types import CallbackQuery, Message, TelegramObject
 
 from src.bot.texts.auth_text import access_check_error, access_check_error_alert, no_rights, no_rights_alert
+from src.core.config import settings
+from src.moderation.auth_cache import ModeratorAuthCache
 from src.moderation.client import ModerationClient
 
 
+def create_auth_cache() -> ModeratorAuthCache:
+    return ModeratorAuthCache(
+        max_size=settings.auth_cache_size,
+        ttl=settings.auth_cache_ttl,
+        negative_ttl=settings.auth_cache_negative_ttl,
+        stale_ttl=settings.auth_cache_stale_ttl,
+    )
+
+
 class ModeratorAuthMiddleware(BaseMiddleware):
-    def __init__(self):
+    def __init__(self, cache: ModeratorAuthCache | None = None):
         self.client: ModerationClient | None = None
+        self.cache = cache if cache is not None else create_auth_cache()
 
     async def __call__(
             self,
@@ -33,7 +45,7 @@ class ModeratorAuthMiddleware(BaseMiddleware):
             return await handler(event, data)
 
         try:
-            is_moderator = await self.client.check_moderator(user_id)
+            is_moderator = await self.cache.check(self.client, user_id)
             if not is_moderator:
                 if isinstance(event, Message):
                     await event.answer(no_rights)
@@ -0,0 +1,55 @@
+import time
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from src.core.instrumentation import HANDLER_ERRORS, HANDLER_SECONDS, TELEGRAM_API_ERRORS, TELEGRAM_API_SECONDS
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Пишет длительность и ошибки хендлеров с меткой по имени функции хендлера."""
+
+    def __init__(self) -> None:
+        self._children: dict[Any, tuple[Any, Any]] = {}
+
+    async def __call__(self, handler, event: TelegramObject, data: dict):
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        children = self._children.get(callback)
+        if children is None:
+            name = getattr(callback, "__name__", "unknown")
+            children = self._children[callback] = (HANDLER_SECONDS.labels(name), HANDLER_ERRORS.labels(name))
+        observed, failed = children
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            failed.inc()
+            raise
+        finally:
+            observed.observe(time.perf_counter() - started)
+
+
+class TelegramApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: длительность и ошибки вызовов Telegram Bot API по методам."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_API_ERRORS.labels(name, type(e).__name__).inc()
+            raise
+        finally:
+            TELEGRAM_API_SECONDS.labels(name).observe(time.perf_counter() - started)
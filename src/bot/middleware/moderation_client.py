@@ -1,3 +1,5 @@
+from typing import Any
+
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 
@@ -5,9 +7,13 @@ from src.moderation.client import ModerationClient
 
 
 class ModerationClientMiddleware(BaseMiddleware):
-    def __init__(self, client: ModerationClient):
+    """Прокидывает в хендлеры клиент модерации и общие сервисы бота (кэши, пулы и т.п.)."""
+
+    def __init__(self, client: ModerationClient, **services: Any):
         self.client = client
+        self.services = services
 
     async def __call__(self, handler, event: TelegramObject, data: dict):
         data["moderation_client"] = self.client
+        data.update(self.services)
         return await handler(event, data)
@@ -5,3 +5,7 @@ class Actions(StrEnum):
 
     APPROVE_PHOTO = "approve_photo"
     REJECT_PHOTO = "reject_photo"
+    TOGGLE_SELECT = "toggle_select"
+    APPROVE_SELECTED = "approve_selected"
+    REJECT_SELECTED = "reject_selected"
+    SHOW_ORIGINALS = "show_originals"
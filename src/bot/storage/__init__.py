@@ -0,0 +1,26 @@
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from src.core.config import settings
+
+from .sqlite import SQLiteStorage
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Создаёт FSM storage по настройке FSM_STORAGE (memory | sqlite)."""
+    backend = settings.fsm_storage.lower()
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "sqlite":
+        return SQLiteStorage(
+            settings.fsm_storage_path,
+            ttl=settings.fsm_ttl,
+            batch_delay=settings.fsm_batch_delay,
+        )
+    raise ValueError(f"Unknown FSM storage backend: {settings.fsm_storage}")
+
+
+__all__ = [
+    "SQLiteStorage",
+    "create_fsm_storage",
+]
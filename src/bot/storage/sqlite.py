@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import time
+from collections.abc import Callable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+T = TypeVar("T")
+
+_UNSET: Any = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+)
+"""
+# Если старая запись уже истекла, вторая колонка сбрасывается, чтобы не воскрешать устаревшие данные.
+_UPSERT_STATE = """
+INSERT INTO fsm (key, state, updated_at) VALUES (:key, :value, :now)
+ON CONFLICT(key) DO UPDATE SET
+    state = excluded.state,
+    data = CASE WHEN fsm.updated_at < :deadline THEN '{}' ELSE fsm.data END,
+    updated_at = excluded.updated_at
+"""
+_UPSERT_DATA = """
+INSERT INTO fsm (key, data, updated_at) VALUES (:key, :value, :now)
+ON CONFLICT(key) DO UPDATE SET
+    data = excluded.data,
+    state = CASE WHEN fsm.updated_at < :deadline THEN NULL ELSE fsm.state END,
+    updated_at = excluded.updated_at
+"""
+
+
+@dataclass
+class _PendingWrite:
+    state: Any = _UNSET
+    data: Any = _UNSET
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM storage в SQLite (WAL), который могут одновременно использовать несколько процессов бота на одном хосте.
+
+    Записи, пришедшие в пределах batch_delay, коммитятся одной транзакцией (group commit);
+    вызов set_* возвращается только после коммита, поэтому другие процессы сразу видят изменения.
+    Записи, которые не обновлялись дольше ttl, считаются истёкшими и периодически удаляются.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        ttl: float = 7 * 24 * 3600,
+        batch_delay: float = 0.005,
+        cleanup_interval: float = 3600.0,
+        busy_timeout: float = 5.0,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.batch_delay = batch_delay
+        self.cleanup_interval = cleanup_interval
+        self.busy_timeout = busy_timeout
+        # Одно соединение, с которым работает только один поток.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._conn: sqlite3.Connection | None = None
+        self._pending: dict[str, _PendingWrite] = {}
+        self._committing: dict[str, _PendingWrite] = {}
+        self._waiters: list[asyncio.Future[None]] = []
+        self._flush_task: asyncio.Task[None] | None = None
+        self._cleanup_task: asyncio.Task[None] | None = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._write(self._key(key), state=value)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        pending = self._pending_value(self._key(key), "state")
+        if pending is not _UNSET:
+            return pending
+        row = await self._run(self._select, self._key(key))
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        await self._write(self._key(key), data=json.dumps(data, ensure_ascii=False))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        pending = self._pending_value(self._key(key), "data")
+        if pending is not _UNSET:
+            return json.loads(pending)
+        row = await self._run(self._select, self._key(key))
+        return json.loads(row[1]) if row else {}
+
+    async def close(self) -> None:
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+        await self._run(self._close_connection)
+        self._executor.shutdown(wait=True)
+
+    async def cleanup(self) -> int:
+        """Удаляет истёкшие записи; возвращает их количество."""
+        return await self._run(self._delete_expired, time.time() - self.ttl)
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        parts = [key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny]
+        return ":".join("" if part is None else str(part) for part in parts)
+
+    def _pending_value(self, key: str, field: str) -> Any:
+        """Значение, записанное в этом процессе, но ещё не закоммиченное (или _UNSET)."""
+        for writes in (self._pending, self._committing):
+            write = writes.get(key)
+            if write is not None and getattr(write, field) is not _UNSET:
+                return getattr(write, field)
+        return _UNSET
+
+    async def _write(self, key: str, **fields: Any) -> None:
+        pending = self._pending.setdefault(key, _PendingWrite())
+        for name, value in fields.items():
+            setattr(pending, name, value)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if self._cleanup_task is None and self.cleanup_interval > 0:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+        await waiter
+
+    async def _flush_loop(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.batch_delay)
+            self._committing, self._pending = self._pending, {}
+            waiters, self._waiters = self._waiters, []
+            try:
+                await self._run(self._commit, self._committing, time.time())
+            except Exception as e:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            else:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+            finally:
+                self._committing = {}
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            try:
+                await self.cleanup()
+            except Exception as e:
+                print(f"Error cleaning up FSM storage: {e}")
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # Методы ниже выполняются только в потоке self._executor.
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _select(self, key: str) -> tuple[str | None, str] | None:
+        cursor = self._connection().execute(
+            "SELECT state, data FROM fsm WHERE key = ? AND updated_at >= ?",
+            (key, time.time() - self.ttl),
+        )
+        return cursor.fetchone()
+
+    def _commit(self, batch: dict[str, _PendingWrite], now: float) -> None:
+        deadline = now - self.ttl
+        states = [
+            {"key": key, "value": write.state, "now": now, "deadline": deadline}
+            for key, write in batch.items()
+            if write.state is not _UNSET
+        ]
+        data = [
+            {"key": key, "value": write.data, "now": now, "deadline": deadline}
+            for key, write in batch.items()
+            if write.data is not _UNSET
+        ]
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if states:
+                conn.executemany(_UPSERT_STATE, states)
+            if data:
+                conn.executemany(_UPSERT_DATA, data)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _delete_expired(self, deadline: float) -> int:
+        cursor = self._connection().execute("DELETE FROM fsm WHERE updated_at < ?", (deadline,))
+        return cursor.rowcount
+
+    def _close_connection(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
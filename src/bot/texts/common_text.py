@@ -1,7 +1,13 @@
 next_photo: str = "Следующие фото для проверки"
 new_task_notification: str = "Новая задача на модерации"
+new_tasks_notification: str = "Новых задач на модерации: {count}"
 cancel: str = "Отмена"
 close: str = "Закрыть"
 ok: str = "Окей"
 reject: str = "Отклонить"
 approve: str = "Одобрить"
+select_task: str = "☐ Выбрать"
+selected_task: str = "☑ Выбрано"
+approve_selected: str = "Одобрить выбранные"
+reject_selected: str = "Отклонить выбранные"
+show_originals: str = "Оригиналы"
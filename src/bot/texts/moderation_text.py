@@ -2,3 +2,16 @@ photo_info: str = """
 Задание: {}
 Описание: {}
 Теги: {}"""
+
+original_photos: str = "Оригиналы фото"
+duplicates_header: str = "\n\n⚠️ Возможные дубликаты:"
+duplicate_of_example: str = "• фото {photo} — похоже на пример из задания (отличие {distance} бит)"
+duplicate_of_task: str = "• фото {photo} — уже было в задаче #{task} (отличие {distance} бит)"
+failed_approve: str = "Не удалось одобрить задачу #{task}: {error}. Возьмите её на модерацию ещё раз."
+decision_conflict: str = "По задаче #{task} уже ждёт отправки другое решение: {action}."
+decision_conflicts: str = "По {count} задачам уже ждёт отправки другое решение."
+decision_action_names: dict[str, str] = {"approve": "одобрить", "reject": "отклонить"}
+failed_reject: str = "Не удалось отклонить задачу #{task}: {error}. Возьмите её на модерацию ещё раз."
+tasks_taken_by_others: str = (
+    "Свободных задач сейчас нет: выданные задачи уже у других модераторов. Попробуйте чуть позже."
+)
@@ -12,6 +12,79 @@ class Settings(BaseSettings):
     notify_host: str = "0.0.0.0"
     notify_port: int = 8090
     notify_path: str = "/api/moderation/notify"
+    bot_mode: str = "polling"  # polling | webhook
+    webhook_base_url: AnyUrl | None = None  # публичный адрес сервиса, на который Telegram шлёт апдейты
+    webhook_path: str = "/api/telegram/webhook"
+    webhook_secret: str = ""
+    fake_backend: bool = False  # поднять на API-сервере имитацию ручек backend для локальной проверки
+    decision_batch_window: float = 0.0  # секунды на сбор решений в один bulk-запрос; 0 — без группировки
+    decision_batch_size: int = 50
+    moderation_multi_select: bool = False  # клавиатура с выбором нескольких задач
+    decision_write_behind: bool = False  # отвечать на нажатие сразу, а решение отправлять в фоне через outbox
+    decision_outbox_path: str = "decision_outbox.sqlite3"
+    decision_outbox_max_attempts: int = 5
+    decision_outbox_retry_base_delay: float = 2.0
+    fsm_storage: str = "memory"  # memory | sqlite
+    fsm_storage_path: str = "fsm.sqlite3"
+    fsm_ttl: float = 7 * 24 * 3600  # секунды без обновлений, после которых состояние удаляется
+    fsm_batch_delay: float = 0.005  # окно группировки записей в одну транзакцию
+    http_pool_limit: int = 100
+    http_pool_limit_per_host: int = 30
+    http_keepalive_timeout: float = 30.0
+    http_dns_cache_ttl: int = 300
+    http_timeout_next: float = 5.0
+    http_timeout_metrics: float = 20.0
+    http_timeout_decision: float = 10.0
+    http_timeout_check: float = 3.0
+    http_retry_attempts: int = 3  # всего попыток для идемпотентных GET
+    http_retry_base_delay: float = 0.2
+    http_breaker_failures: int = 5  # ошибок подряд до открытия circuit breaker
+    http_breaker_recovery: float = 30.0  # секунды до пробного запроса
+    auth_cache_size: int = 1024
+    auth_cache_ttl: float = 60.0  # секунды для положительного ответа
+    auth_cache_negative_ttl: float = 10.0  # секунды для отказа в доступе
+    auth_cache_stale_ttl: float = 600.0  # сколько можно отдавать старый ответ при ошибке backend
+    notify_global_rate: float = 30.0  # сообщений в секунду на весь бот
+    notify_chat_rate: float = 1.0  # сообщений в секунду в один чат
+    notify_max_concurrency: int = 30
+    notify_max_retries: int = 3
+    notify_retry_base_delay: float = 0.5
+    notify_max_retry_after: float = 60.0
+    notify_coalesce_window: float = 60.0  # секунды; 0 — каждое уведомление отдельным сообщением
+    notify_jobs_path: str | None = "notify_jobs.sqlite3"  # None — без асинхронных рассылок /notify/jobs
+    notify_jobs_max_pending: int = 1000
+    notify_job_workers: int = 2
+    notify_jobs_ttl: float = 24 * 3600  # сколько хранить результаты завершённых рассылок
+    prefetch_size: int = 2  # 0 — без предзагрузки задач
+    prefetch_lease_timeout: float = 120.0  # секунды, после которых предзагруженная задача считается устаревшей
+    task_lease_ttl: float = 300.0  # секунды, пока задача закреплена за модератором; 0 — без аренды задач
+    task_lease_max_refetch: int = 3  # сколько раз запросить другую задачу, если выданная уже у другого модератора
+    file_id_cache_size: int = 5000  # 0 — не кэшировать file_id фотографий
+    file_id_cache_path: str | None = None  # json-файл для сохранения кэша между перезапусками
+    photo_preview_size: int = 0  # максимальная сторона превью фото задачи в px; 0 — отправлять оригиналы документами
+    photo_preview_quality: int = 80
+    photo_preview_workers: int = 2
+    photo_preview_cache_dir: str = ".photo_previews"
+    photo_preview_cache_bytes: int = 512 * 1024 * 1024
+    photo_preview_max_download_bytes: int = 20 * 1024 * 1024
+    photo_preview_timeout: float = 15.0
+    phash_enabled: bool = False  # искать дубликаты фото по перцептивному хэшу
+    phash_index_path: str | None = "phash.bin"
+    phash_radius: int = 6  # максимальное расстояние Хэмминга (бит из 64), до 11
+    phash_workers: int = 1
+    phash_timeout: float = 10.0
+    chart_renderer: str = "matplotlib"  # matplotlib | pillow (быстрее и легче, без matplotlib в памяти)
+    chart_render_workers: int = 1  # процессы для отрисовки графиков; 0 — рисовать в основном процессе
+    chart_render_concurrency: int = 2
+    chart_render_timeout: float = 30.0
+    warmup_enabled: bool = True  # прогревать matplotlib и пулы процессов в фоне после старта
+    readiness_requires_warmup: bool = False  # /readyz отвечает 200 только после прогрева
+    loop_lag_interval: float = 0.5  # как часто измерять задержку event loop для /metrics API; 0 — не измерять
+    metrics_incremental: bool = True  # считать /metrics инкрементально, а не по всей истории каждый раз
+    metrics_rollup_days: int = 400  # сколько дней хранить дневные агрегаты для /metrics day|week|month; 0 — не хранить
+    metrics_store_dir: str | None = ".metrics_store"  # локальная история событий метрик; None — не хранить
+    metrics_store_refresh: float = 30.0  # не чаще скольких секунд запрашивать /api/metrics у backend
+    metrics_rollup_exact_days: int = 62  # за сколько последних дней число пользователей считается точно, а не скетчем
 
     @property
     def api_base(self) -> AnyUrl:
@@ -27,6 +100,24 @@ class Settings(BaseSettings):
 
         return base
 
+    @property
+    def webhook_url(self) -> str:
+        """Полный адрес webhook для Telegram."""
+        if self.webhook_base_url is None:
+            raise ValueError("Webhook base URL is not configured")
+
+        return str(self.webhook_base_url).rstrip("/") + self.webhook_path
+
+    def require_webhook_secret(self) -> str:
+        """
+        Секрет webhook; в режиме webhook обязателен: API слушает 0.0.0.0, и без проверки заголовка
+        любой может прислать поддельный апдейт от имени модератора.
+        """
+        if not self.webhook_secret:
+            raise ValueError("WEBHOOK_SECRET must be set when BOT_MODE=webhook")
+
+        return self.webhook_secret
+
     class Config:
         env_file = ".env"
 
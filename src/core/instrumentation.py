@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from typing import Any, ParamSpec, TypeVar
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+# Все метрики пишутся из потока event loop, поэтому обновления — обычные операции без блокировок.
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # Последний элемент — корзина +Inf.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children: dict[tuple[str, ...], Any] = {}
+        if not self.label_names:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values: str) -> Any:
+        """Значение для набора меток; на горячих путях его стоит получить один раз и сохранить."""
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _label_text(self, values: tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{self._label_text(values)} {_number(child.value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labels)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip((*self.bounds, math.inf), child.counts):
+                cumulative += count
+                le = self._label_text(values, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(values)} {_number(child.sum)}"
+            yield f"{self.name}_count{self._label_text(values)} {child.count}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """collector вызывается перед каждой выдачей метрик и обновляет gauge, которые дешевле снять, чем вести."""
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]) -> None:
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _register(metric: Any) -> Any:
+    return REGISTRY.register(metric)
+
+
+MODERATION_CLIENT_SECONDS: Histogram = _register(
+    Histogram("moderation_client_request_seconds", "Latency of ModerationClient calls", ["method"])
+)
+MODERATION_CLIENT_ERRORS: Counter = _register(
+    Counter("moderation_client_errors_total", "Failed ModerationClient calls", ["method"])
+)
+MODERATION_BREAKER_STATE: Gauge = _register(
+    Gauge("moderation_client_breaker_state", "Circuit breaker state (1 for the current one)", ["state"])
+)
+MODERATION_BREAKER_FAILURES: Gauge = _register(
+    Gauge("moderation_client_breaker_failures", "Consecutive failures seen by the circuit breaker")
+)
+MODERATION_BREAKER_REJECTED: Counter = _register(
+    Counter("moderation_client_breaker_rejected_total", "Calls rejected by the open circuit breaker")
+)
+MODERATION_POOL_CONNECTIONS: Gauge = _register(
+    Gauge("moderation_client_pool_connections", "Backend connections in the aiohttp pool", ["state"])
+)
+MODERATION_POOL_LIMIT: Gauge = _register(
+    Gauge("moderation_client_pool_limit", "Connection limit of the aiohttp pool", ["scope"])
+)
+HANDLER_SECONDS: Histogram = _register(Histogram("bot_handler_seconds", "Latency of bot handlers", ["handler"]))
+HANDLER_ERRORS: Counter = _register(Counter("bot_handler_errors_total", "Bot handlers that raised", ["handler"]))
+TELEGRAM_API_SECONDS: Histogram = _register(
+    Histogram("telegram_api_request_seconds", "Latency of Telegram Bot API calls", ["method"])
+)
+TELEGRAM_API_ERRORS: Counter = _register(
+    Counter("telegram_api_errors_total", "Failed Telegram Bot API calls", ["method", "error"])
+)
+NOTIFY_FANOUT: Histogram = _register(
+    Histogram("notify_fanout_size", "Moderators per notify request", buckets=SIZE_BUCKETS)
+)
+NOTIFY_FAILURES: Counter = _register(Counter("notify_failures_total", "Notifications that were not delivered"))
+TASK_LEASE_EVENTS: Counter = _register(
+    Counter("task_lease_events_total", "Task lease registry events (conflict = duplicate render avoided)", ["event"])
+)
+TASK_REFETCHES: Counter = _register(
+    Counter("task_refetches_total", "Extra next() calls because the task was leased by another moderator")
+)
+EVENT_LOOP_LAG: Histogram = _register(
+    Histogram("event_loop_lag_seconds", "Delay of event loop wake-ups", buckets=LAG_BUCKETS)
+)
+EVENT_LOOP_LAG_LAST: Gauge = _register(Gauge("event_loop_lag_last_seconds", "Last measured event loop lag"))
+
+
+def timed_async(
+    histogram: Histogram, errors: Counter, label: str
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """Декоратор корутины: пишет её длительность и ошибки с меткой label."""
+    observed = histogram.labels(label)
+    failed = errors.labels(label)
+
+    def decorator(fn: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                failed.inc()
+                raise
+            finally:
+                observed.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+class LoopLagMonitor:
+    """Раз в interval секунд засыпает и измеряет, насколько позже запланированного проснулся event loop."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            EVENT_LOOP_LAG.observe(lag)
+            EVENT_LOOP_LAG_LAST.set(lag)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(float(value))
+    return repr(float(value))
@@ -0,0 +1,26 @@
+class Readiness:
+    """
+    Готовность сервиса для /readyz: готов, когда все зарегистрированные компоненты отметились.
+
+    Компонент сначала объявляется через require(), потом отмечается set_ready() и снимается
+    set_not_ready() при остановке, чтобы балансировщик перестал слать запросы ещё до выхода.
+    """
+
+    def __init__(self) -> None:
+        self._components: dict[str, bool] = {}
+
+    def require(self, name: str) -> None:
+        self._components.setdefault(name, False)
+
+    def set_ready(self, name: str) -> None:
+        self._components[name] = True
+
+    def set_not_ready(self, name: str) -> None:
+        self._components[name] = False
+
+    @property
+    def ready(self) -> bool:
+        return all(self._components.values())
+
+    def status(self) -> dict[str, bool]:
+        return dict(self._components)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from src.core.readiness import Readiness
+
+READINESS_NAME = "warmup"
+
+
+class BackgroundWarmup:
+    """
+    Прогрев тяжёлых модулей и пулов процессов в фоне после старта, чтобы первый /metrics или первое фото
+    не ждали импорта matplotlib и запуска воркеров.
+
+    Синхронные шаги выполняются в потоке, асинхронные — в event loop. Ошибка шага только логируется.
+    Если передан readiness, компонент «warmup» становится готов после всех шагов.
+    """
+
+    def __init__(self, readiness: Readiness | None = None):
+        self.readiness = readiness
+        self.durations: dict[str, float] = {}
+        self._steps: list[tuple[str, Callable[[], Any]]] = []
+        self._task: asyncio.Task[None] | None = None
+        if readiness is not None:
+            readiness.require(READINESS_NAME)
+
+    def add(self, name: str, step: Callable[[], Awaitable[Any] | Any]) -> None:
+        self._steps.append((name, step))
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        for name, step in self._steps:
+            started = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(step):
+                    await step()
+                else:
+                    await asyncio.to_thread(step)
+            except Exception as e:
+                print(f"Warm-up step {name} failed: {e}")
+            self.durations[name] = time.perf_counter() - started
+        if self.readiness is not None:
+            self.readiness.set_ready(READINESS_NAME)
+        total = sum(self.durations.values())
+        print(f"Warm-up finished in {total:.2f}s: " + ", ".join(f"{k}={v:.2f}s" for k, v in self.durations.items()))
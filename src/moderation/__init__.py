@@ -1,7 +1,12 @@
+from .auth_cache import AuthCacheStats, ModeratorAuthCache
 from .client import ModerationClient, create_http_session
+from .leases import LeaseStats, TaskLeaseRegistry
+from .prefetch import PrefetchStats, TaskPrefetcher
 from .models import MetricModel, MetricsListModel, MetricType, ModerationTask, PhotoModel, TaskExtendedInfo
 
 __all__ = [
+    "AuthCacheStats",
+    "ModeratorAuthCache",
     "ModerationClient",
     "create_http_session",
     "MetricModel",
@@ -10,4 +15,8 @@ __all__ = [
     "ModerationTask",
     "PhotoModel",
     "TaskExtendedInfo",
+    "PrefetchStats",
+    "TaskPrefetcher",
+    "LeaseStats",
+    "TaskLeaseRegistry",
 ]
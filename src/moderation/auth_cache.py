@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.moderation.client import ModerationClient
+
+
+@dataclass
+class AuthCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    stale_hits: int = 0
+    errors: int = 0
+    evictions: int = 0
+
+    @property
+    def backend_calls_saved(self) -> int:
+        return self.hits + self.coalesced
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.coalesced + self.misses
+        return self.backend_calls_saved / total if total else 0.0
+
+
+@dataclass
+class _AuthEntry:
+    value: bool
+    expires_at: float
+    stale_until: float
+
+
+class ModeratorAuthCache:
+    """
+    Кэш проверок прав модератора с раздельным TTL для положительных и отрицательных ответов.
+
+    Одновременные проверки одного пользователя схлопываются в один запрос к backend,
+    а при ошибке backend используется недавний закэшированный ответ (не старше stale_ttl).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int = 1024,
+        ttl: float = 60.0,
+        negative_ttl: float = 10.0,
+        stale_ttl: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.stats = AuthCacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[int, _AuthEntry] = OrderedDict()
+        self._in_flight: dict[int, asyncio.Task[bool]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def check(self, client: ModerationClient, user_id: int) -> bool:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.expires_at > self._clock():
+            self._entries.move_to_end(user_id)
+            self.stats.hits += 1
+            return entry.value
+
+        pending = self._in_flight.get(user_id)
+        if pending is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.stats.misses += 1
+        task = asyncio.create_task(self._load(client, user_id))
+        self._in_flight[user_id] = task
+        task.add_done_callback(lambda t: self._forget(user_id, t))
+        return await asyncio.shield(task)
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        """Сбрасывает закэшированный ответ для пользователя (или весь кэш)."""
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    async def _load(self, client: ModerationClient, user_id: int) -> bool:
+        try:
+            value = await client.check_moderator(user_id)
+        except Exception:
+            self.stats.errors += 1
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.stale_until > self._clock():
+                self.stats.stale_hits += 1
+                return entry.value
+            raise
+
+        self._store(user_id, value)
+        return value
+
+    def _store(self, user_id: int, value: bool) -> None:
+        now = self._clock()
+        ttl = self.ttl if value else self.negative_ttl
+        self._entries[user_id] = _AuthEntry(
+            value=value,
+            expires_at=now + ttl,
+            stale_until=now + max(ttl, self.stale_ttl),
+        )
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _forget(self, user_id: int, task: asyncio.Task[bool]) -> None:
+        if self._in_flight.get(user_id) is task:
+            del self._in_flight[user_id]
+        if not task.cancelled():
+            # Помечаем исключение как полученное, даже если все ожидающие были отменены.
+            task.exception()
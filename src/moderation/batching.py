@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+
+from src.moderation.client import ModerationClient
+from src.moderation.models import Decision, DecisionAction, DecisionResult
+
+
+@dataclass
+class BatchingStats:
+    decisions: int = 0
+    batches: int = 0
+    duplicates: int = 0
+    conflicts: int = 0
+
+    @property
+    def requests_saved(self) -> int:
+        return self.decisions - self.batches
+
+
+class DecisionBatcher:
+    """
+    Собирает решения модераторов, принятые в течение window секунд, в один bulk-запрос.
+
+    Каждый вызов submit получает свой DecisionResult. Повторное решение по задаче,
+    которая ещё ждёт отправки, не дублируется и получает тот же результат; противоположное
+    решение по такой задаче не отправляется и сразу получает ошибку.
+    """
+
+    def __init__(self, client: ModerationClient, *, window: float = 0.15, max_batch: int = 50):
+        self.client = client
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.stats = BatchingStats()
+        self._pending: dict[int, tuple[Decision, asyncio.Future[DecisionResult]]] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._in_flight: set[asyncio.Task[None]] = set()
+
+    async def submit(self, user_task_id: int, action: DecisionAction) -> DecisionResult:
+        pending = self._pending.get(user_task_id)
+        if pending is not None:
+            if pending[0].action != action:
+                self.stats.conflicts += 1
+                return DecisionResult(
+                    userTaskId=user_task_id,
+                    ok=False,
+                    error=f"По задаче уже отправляется другое решение ({pending[0].action.value})",
+                )
+            self.stats.duplicates += 1
+            return await asyncio.shield(pending[1])
+
+        future: asyncio.Future[DecisionResult] = asyncio.get_running_loop().create_future()
+        self._pending[user_task_id] = (Decision(userTaskId=user_task_id, action=action), future)
+        self.stats.decisions += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+
+    async def submit_many(self, decisions: list[Decision]) -> list[DecisionResult]:
+        return list(await asyncio.gather(*(self.submit(d.userTaskId, d.action) for d in decisions)))
+
+    async def close(self) -> None:
+        self._flush()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        self.stats.batches += 1
+        task = asyncio.create_task(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: dict[int, tuple[Decision, asyncio.Future[DecisionResult]]]) -> None:
+        decisions = [decision for decision, _ in batch.values()]
+        try:
+            results = await self.client.bulk_decide(decisions)
+        except Exception as e:
+            results = [DecisionResult(userTaskId=d.userTaskId, ok=False, error=str(e)) for d in decisions]
+
+        by_id = {result.userTaskId: result for result in results}
+        for user_task_id, (_, future) in batch.items():
+            if future.done():
+                continue
+            result = by_id.get(user_task_id)
+            if result is None:
+                result = DecisionResult(userTaskId=user_task_id, ok=False, error="Нет результата от backend")
+            future.set_result(result)
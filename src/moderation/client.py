@@ -1,60 +1,172 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any
 
 import aiohttp
-from aiohttp import ClientSession, ClientTimeout
+from aiohttp import ClientResponse, ClientSession, ClientTimeout
 
 from src.core.config import settings
-from src.moderation.models import MetricsListModel, ModerationTask,ModeratorCheckResponse
+from src.core.instrumentation import (
+    MODERATION_BREAKER_FAILURES,
+    MODERATION_BREAKER_REJECTED,
+    MODERATION_BREAKER_STATE,
+    MODERATION_CLIENT_ERRORS,
+    MODERATION_CLIENT_SECONDS,
+    MODERATION_POOL_CONNECTIONS,
+    MODERATION_POOL_LIMIT,
+    timed_async,
+)
+from src.moderation.http import (
+    RETRYABLE_STATUSES,
+    CircuitBreaker,
+    CircuitOpenError,
+    PoolState,
+    RetryPolicy,
+    create_connector,
+    pool_state,
+)
+from src.moderation.models import (
+    BulkDecisionRequest,
+    BulkDecisionResponse,
+    Decision,
+    DecisionAction,
+    DecisionResult,
+    MetricsListModel,
+    ModerationTask,
+    ModeratorCheckResponse,
+)
+
+if TYPE_CHECKING:
+    # metrics_columnar тянет metrics_visualization, а тот — src.moderation.models и весь пакет src.moderation,
+    # поэтому во время выполнения модуль импортируется только внутри metrics_columns.
+    from src.utilities.metrics_columnar import MetricsColumns
+
+METRICS_CHUNK_SIZE = 64 * 1024
+
+
+def _timed(method: str):
+    return timed_async(MODERATION_CLIENT_SECONDS, MODERATION_CLIENT_ERRORS, method)
 
 
 class ModerationClient:
-    def __init__(self, base_url: str, session: ClientSession):
+    def __init__(
+        self,
+        base_url: str,
+        session: ClientSession,
+        *,
+        breaker: CircuitBreaker | None = None,
+        retry_policy: RetryPolicy | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.session = session
         self.headers: dict[str, str] = {}
         if settings.bot_secret:
             self.headers["Authorization"] = f"Bearer {settings.bot_secret}"
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=settings.http_breaker_failures,
+            recovery_timeout=settings.http_breaker_recovery,
+        )
+        self.retry_policy = retry_policy or RetryPolicy(
+            attempts=settings.http_retry_attempts,
+            base_delay=settings.http_retry_base_delay,
+        )
+        self.bulk_supported = True
+        self.timeouts = {
+            "next": ClientTimeout(total=settings.http_timeout_next),
+            "metrics": ClientTimeout(total=settings.http_timeout_metrics),
+            "decision": ClientTimeout(total=settings.http_timeout_decision),
+            "check": ClientTimeout(total=settings.http_timeout_check),
+        }
 
+    @_timed("next")
     async def next(self) -> ModerationTask | None:
         url = f"{self.base_url}/api/moderation/next"
-        timeout = ClientTimeout(total=10)
-        async with self.session.get(url, headers=self.headers, timeout=timeout) as resp:
+        # Выдача задачи может её резервировать, поэтому повторяем только неустановленное соединение.
+        async with self._request("GET", url, "next", idempotent=False) as resp:
             if resp.status == 204:
                 return None
             resp.raise_for_status()
             data: Any = await resp.json()
             return ModerationTask.model_validate(data)
 
+    @_timed("metrics")
     async def metrics(self) -> MetricsListModel | None:
         url = f"{self.base_url}/api/metrics"
-        timeout = ClientTimeout(total=10)
-        async with self.session.get(url, headers=self.headers, timeout=timeout) as resp:
+        async with self._request("GET", url, "metrics") as resp:
             if resp.status == 204:
                 return None
             resp.raise_for_status()
             data = await resp.json()
             return MetricsListModel.model_validate(data)
 
+    @_timed("metrics_columns")
+    async def metrics_columns(self) -> MetricsColumns | None:
+        """Как metrics(), но читает ответ потоково и сразу раскладывает его по колонкам."""
+        url = f"{self.base_url}/api/metrics"
+        async with self._request("GET", url, "metrics") as resp:
+            if resp.status == 204:
+                return None
+            resp.raise_for_status()
+            from src.moderation.metrics_stream import MetricsStreamDecoder
+
+            decoder = MetricsStreamDecoder()
+            async for chunk in resp.content.iter_chunked(METRICS_CHUNK_SIZE):
+                decoder.feed(chunk)
+            return decoder.finish()
+
+    @_timed("approve")
     async def approve(self, user_task_id: int) -> bool:
         url = f"{self.base_url}/api/moderation/{user_task_id}/approve"
-        timeout = ClientTimeout(total=10)
-        async with self.session.post(url, headers=self.headers, timeout=timeout) as resp:
+        async with self._request("POST", url, "decision", idempotent=False) as resp:
             resp.raise_for_status()
             return resp.status == 200
 
+    @_timed("reject")
     async def reject(self, user_task_id: int) -> bool:
         url = f"{self.base_url}/api/moderation/{user_task_id}/reject"
-        timeout = ClientTimeout(total=10)
-        async with self.session.post(url, headers=self.headers, timeout=timeout) as resp:
+        async with self._request("POST", url, "decision", idempotent=False) as resp:
             resp.raise_for_status()
             return resp.status == 200
 
+    async def decide(self, decision: Decision) -> bool:
+        if decision.action == DecisionAction.APPROVE:
+            return await self.approve(decision.userTaskId)
+        return await self.reject(decision.userTaskId)
+
+    @_timed("bulk_decide")
+    async def bulk_decide(self, decisions: list[Decision]) -> list[DecisionResult]:
+        """
+        Отправляет несколько решений одним запросом.
+
+        Если backend не поддерживает bulk-ручку (404/405), решения отправляются по одному,
+        а клиент запоминает это и дальше сразу идёт по одному.
+        """
+        if self.bulk_supported:
+            url = f"{self.base_url}/api/moderation/bulk"
+            payload = BulkDecisionRequest(decisions=decisions).model_dump(mode="json")
+            async with self._request("POST", url, "decision", idempotent=False, json=payload) as resp:
+                if resp.status in (404, 405):
+                    self.bulk_supported = False
+                else:
+                    resp.raise_for_status()
+                    return BulkDecisionResponse.model_validate(await resp.json()).results
+
+        return list(await asyncio.gather(*(self._decide_one(decision) for decision in decisions)))
+
+    async def _decide_one(self, decision: Decision) -> DecisionResult:
+        try:
+            ok = await self.decide(decision)
+        except Exception as e:
+            return DecisionResult(userTaskId=decision.userTaskId, ok=False, error=str(e))
+        return DecisionResult(userTaskId=decision.userTaskId, ok=ok)
+
+    @_timed("check_moderator")
     async def check_moderator(self, user_id: int) -> bool:
         url = f"{self.base_url}/api/moderation/{user_id}/check"
-        timeout = ClientTimeout(total=10)
-        async with self.session.get(url, headers=self.headers, timeout=timeout) as resp:
+        async with self._request("GET", url, "check") as resp:
             if resp.status in (204, 404):
                 return False
             resp.raise_for_status()
@@ -63,6 +175,77 @@ class ModerationClient:
                 return data
             return False
 
+    def pool_state(self) -> PoolState | None:
+        return pool_state(self.session.connector)
+
+    def export_metrics(self) -> None:
+        """Переносит состояние breaker и пула соединений в gauge для `GET /metrics`."""
+        # state читается свойством: так open, у которого истёк recovery_timeout, виден как half_open.
+        current = self.breaker.state
+        for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN):
+            MODERATION_BREAKER_STATE.labels(state).set(1 if state == current else 0)
+        MODERATION_BREAKER_FAILURES.set(self.breaker.failures)
+        pool = self.pool_state()
+        if pool is not None:
+            MODERATION_POOL_CONNECTIONS.labels("acquired").set(pool.acquired)
+            MODERATION_POOL_CONNECTIONS.labels("idle").set(pool.idle)
+            MODERATION_POOL_LIMIT.labels("total").set(pool.limit)
+            MODERATION_POOL_LIMIT.labels("per_host").set(pool.limit_per_host)
+
+    @asynccontextmanager
+    async def _request(
+        self, method: str, url: str, endpoint: str, *, idempotent: bool = True, json: Any = None
+    ) -> AsyncIterator[ClientResponse]:
+        """
+        Отправляет запрос через circuit breaker.
+
+        Идемпотентные запросы повторяются с jitter при сетевых ошибках, таймаутах и 502/503/504;
+        остальные — только если соединение с backend не удалось установить.
+
+        Breaker видит логический запрос целиком: пропуск берётся один раз, а исход (успех или одна
+        ошибка, сколько бы ни было повторов) записывается по последней попытке. Если запрос прерван
+        чем угодно ещё, включая отмену, это тоже считается ошибкой, иначе пробный запрос в half_open
+        навсегда занял бы свой слот.
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            MODERATION_BREAKER_REJECTED.inc()
+            raise
+        recorded = False
+        try:
+            attempt = 0
+            while True:
+                try:
+                    resp = await self.session.request(
+                        method, url, headers=self.headers, timeout=self.timeouts[endpoint], json=json
+                    )
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    retryable = idempotent or isinstance(e, aiohttp.ClientConnectorError)
+                    if not retryable or attempt + 1 >= self.retry_policy.attempts:
+                        raise
+                else:
+                    last = attempt + 1 >= self.retry_policy.attempts
+                    if not (idempotent and resp.status in RETRYABLE_STATUSES) or last:
+                        if resp.status < 500:
+                            self.breaker.record_success()
+                        else:
+                            self.breaker.record_failure()
+                        recorded = True
+                        try:
+                            yield resp
+                        finally:
+                            resp.release()
+                        return
+                    resp.release()
+
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+                attempt += 1
+        except BaseException:
+            if not recorded:
+                self.breaker.record_failure()
+            raise
+
+
 async def create_http_session() -> ClientSession:
-    connector = aiohttp.TCPConnector()
-    return aiohttp.ClientSession(connector=connector)
+    return aiohttp.ClientSession(connector=create_connector())
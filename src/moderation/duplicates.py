@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import multiprocessing
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.moderation.models import ModerationTask
+from src.utilities.phash import HashIndex, HashKind, HashMatch, hash_images
+
+
+def _warm_up_worker() -> None:
+    import numpy  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+
+def task_ref(task_id: str) -> int:
+    """Стабильный int64 для строкового taskId: под ним в индексе хранятся примеры задания."""
+    return int.from_bytes(hashlib.blake2b(task_id.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+class PhotoDuplicateDetector:
+    """
+    Ищет среди фото задачи почти одинаковые с уже присланными в других задачах или с примерами задания.
+
+    Перцептивные хэши считаются в пуле процессов и хранятся в HashIndex на диске. Хэши по URL
+    дополнительно кэшируются в памяти, чтобы не скачивать повторно одни и те же примеры.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[bytes | None]],
+        index: HashIndex,
+        *,
+        radius: int = 6,
+        workers: int = 1,
+        url_cache_size: int = 10_000,
+    ):
+        self.fetch = fetch
+        self.index = index
+        self.radius = radius
+        self.workers = max(1, workers)
+        self.url_cache_size = url_cache_size
+        self._url_hashes: OrderedDict[str, int] = OrderedDict()
+        self._executor: ProcessPoolExecutor | None = None
+        # Файл индекса читается и дописывается только из этого потока.
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="phash-index")
+        self._ready = False
+        self._compacting: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._io, self.index.load)
+        self._ready = True
+
+    async def warm_up(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._get_executor(), _warm_up_worker)
+
+    async def close(self) -> None:
+        if self._compacting is not None:
+            await asyncio.gather(self._compacting, return_exceptions=True)
+        await self._save()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._io.shutdown(wait=True)
+
+    async def find_duplicates(self, task: ModerationTask) -> dict[int, HashMatch]:
+        """
+        Возвращает для номеров фото из userPhotos самое близкое совпадение в индексе и добавляет фото в индекс.
+
+        Совпадения с фото той же задачи (например, при повторном показе) не считаются дубликатами.
+        """
+        if not self._ready:
+            return {}
+        user_urls = [str(url) for url in task.extendedInfo.userPhotos]
+        example_urls = [str(url) for url in task.extendedInfo.examplePhotos]
+        hashes = await self._hash_urls(user_urls + example_urls)
+
+        example_ref = task_ref(task.taskId)
+        for url in example_urls:
+            value = hashes.get(url)
+            if value is not None and not self.index.contains(value, example_ref, HashKind.EXAMPLE):
+                self.index.add(value, example_ref, HashKind.EXAMPLE)
+
+        duplicates: dict[int, HashMatch] = {}
+        for i, url in enumerate(user_urls):
+            value = hashes.get(url)
+            if value is None:
+                continue
+            matches = [
+                match
+                for match in self.index.search(value, self.radius)
+                if not (match.kind == HashKind.USER and match.ref == task.userTaskId)
+            ]
+            if matches:
+                duplicates[i] = min(matches, key=lambda match: match.distance)
+            if not self.index.contains(value, task.userTaskId, HashKind.USER):
+                self.index.add(value, task.userTaskId, HashKind.USER)
+
+        await self._save()
+        if self.index.needs_compaction and self._compacting is None:
+            self._compacting = asyncio.create_task(self._compact())
+        return duplicates
+
+    async def _hash_urls(self, urls: list[str]) -> dict[str, int]:
+        hashes: dict[str, int] = {}
+        missing = []
+        for url in dict.fromkeys(urls):
+            value = self._url_hashes.get(url)
+            if value is None:
+                missing.append(url)
+            else:
+                self._url_hashes.move_to_end(url)
+                hashes[url] = value
+        if not missing:
+            return hashes
+
+        images = await asyncio.gather(*(self.fetch(url) for url in missing), return_exceptions=True)
+        fetched = [(url, image) for url, image in zip(missing, images) if isinstance(image, bytes)]
+        if not fetched:
+            return hashes
+
+        loop = asyncio.get_running_loop()
+        try:
+            values = await loop.run_in_executor(self._get_executor(), hash_images, [image for _, image in fetched])
+        except BrokenProcessPool:
+            self._executor = None
+            raise
+        for (url, _), value in zip(fetched, values):
+            if value is None:
+                continue
+            hashes[url] = value
+            self._url_hashes[url] = value
+            if len(self._url_hashes) > self.url_cache_size:
+                self._url_hashes.popitem(last=False)
+        return hashes
+
+    async def _save(self) -> None:
+        records = self.index.take_unsaved()
+        if records:
+            await asyncio.get_running_loop().run_in_executor(self._io, self.index.save, records)
+
+    async def _compact(self) -> None:
+        try:
+            records, merged = self.index.snapshot()
+            segment = await asyncio.to_thread(HashIndex.build_segment, records)
+            self.index.install(segment, merged)
+        except Exception as e:
+            print(f"Error compacting photo hash index: {e}")
+        finally:
+            self._compacting = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up_worker,
+            )
+        return self._executor
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import aiohttp
+
+from src.core.config import settings
+
+RETRYABLE_STATUSES = frozenset({502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Backend помечен как недоступный, запрос не отправлялся."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для запросов к backend.
+
+    После failure_threshold ошибок подряд запросы сразу отклоняются (open). Через recovery_timeout
+    пропускается не больше half_open_max_calls пробных запросов (half_open): успех закрывает
+    breaker, ошибка снова открывает его.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._half_open_calls >= self.half_open_max_calls):
+            self.rejected += 1
+            raise CircuitOpenError("Backend временно недоступен")
+        if state == self.HALF_OPEN:
+            self._half_open_calls += 1
+
+    def record_success(self) -> None:
+        self._state = self.CLOSED
+        self._failures = 0
+        self._half_open_calls = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.times_opened += 1
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 2.0
+
+    def delay(self, attempt: int) -> float:
+        """Full jitter: случайная задержка от 0 до base_delay * 2^attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+@dataclass
+class PoolState:
+    limit: int
+    limit_per_host: int
+    acquired: int
+    idle: int
+
+
+def create_connector() -> aiohttp.TCPConnector:
+    return aiohttp.TCPConnector(
+        limit=settings.http_pool_limit,
+        limit_per_host=settings.http_pool_limit_per_host,
+        keepalive_timeout=settings.http_keepalive_timeout,
+        ttl_dns_cache=settings.http_dns_cache_ttl,
+        use_dns_cache=True,
+    )
+
+
+def pool_state(connector: aiohttp.BaseConnector | None) -> PoolState | None:
+    if not isinstance(connector, aiohttp.TCPConnector):
+        return None
+    # У aiohttp нет публичного API для занятых/свободных соединений, поэтому смотрим внутренние поля.
+    acquired = len(getattr(connector, "_acquired", ()))
+    idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+    return PoolState(
+        limit=connector.limit,
+        limit_per_host=connector.limit_per_host,
+        acquired=acquired,
+        idle=idle,
+    )
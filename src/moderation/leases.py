@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.core.instrumentation import TASK_LEASE_EVENTS
+
+_ACQUIRED = TASK_LEASE_EVENTS.labels("acquired")
+_CONFLICTS = TASK_LEASE_EVENTS.labels("conflict")
+_RELEASED = TASK_LEASE_EVENTS.labels("released")
+_EXPIRED = TASK_LEASE_EVENTS.labels("expired")
+_DECIDED = TASK_LEASE_EVENTS.labels("decided")
+
+
+@dataclass
+class _Lease:
+    holder: int
+    expires_at: float
+    decided: bool = False
+
+
+@dataclass
+class LeaseStats:
+    acquired: int = 0
+    renewed: int = 0
+    conflicts: int = 0  # задач, которые не показали второму модератору
+    released: int = 0
+    expired: int = 0
+    decided: int = 0  # задач, решение по которым ещё ждёт отправки в backend
+
+
+class TaskLeaseRegistry:
+    """
+    Аренда задач модераторами внутри процесса: пока задача показана одному модератору, другим она не выдаётся.
+
+    Backend может отдать один и тот же userTaskId нескольким модераторам, нажавшим «следующее фото»
+    почти одновременно. Аренда снимается решением по задаче, следующей арендой того же модератора
+    (если он не держит несколько задач сразу, как в режиме выбора) или истекает через ttl секунд.
+    Решение, отложенное в outbox, backend ещё не видел, поэтому до его отправки задача остаётся
+    закрытой для всех (hold_decided), а снимает аренду outbox.
+    """
+
+    def __init__(self, ttl: float = 300.0, *, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.stats = LeaseStats()
+        self._clock = clock
+        # ttl у всех аренд одинаковый, поэтому порядок вставки совпадает с порядком истечения.
+        self._leases: OrderedDict[int, _Lease] = OrderedDict()
+        self._held: dict[int, set[int]] = {}  # holder -> его задачи
+
+    def __len__(self) -> int:
+        self._drop_expired()
+        return len(self._leases)
+
+    def acquire(self, user_task_id: int, holder: int, *, keep_others: bool = False) -> bool:
+        """
+        Берёт задачу в аренду; False, если её держит другой модератор. Свою аренду продлевает.
+
+        Без keep_others остальные задачи этого модератора освобождаются: раз он взял новую,
+        прежнюю он бросил, и другим незачем ждать ttl.
+        """
+        self._drop_expired()
+        lease = self._leases.get(user_task_id)
+        expires_at = self._clock() + self.ttl
+        if lease is not None and (lease.decided or lease.holder != holder):
+            self.stats.conflicts += 1
+            _CONFLICTS.inc()
+            return False
+
+        if not keep_others:
+            for previous in self._held.get(holder, set()) - {user_task_id}:
+                self.release(previous)
+        if lease is None:
+            self._leases[user_task_id] = _Lease(holder, expires_at)
+            self._held.setdefault(holder, set()).add(user_task_id)
+            self.stats.acquired += 1
+            _ACQUIRED.inc()
+            return True
+        lease.expires_at = expires_at
+        self._leases.move_to_end(user_task_id)
+        self.stats.renewed += 1
+        return True
+
+    def release(self, user_task_id: int) -> None:
+        lease = self._leases.pop(user_task_id, None)
+        if lease is not None:
+            self._forget(lease.holder, user_task_id)
+            self.stats.released += 1
+            _RELEASED.inc()
+
+    def hold_decided(self, user_task_id: int) -> None:
+        """
+        Оставляет задачу закрытой после решения, пока его не отправят в backend: release или ttl.
+
+        Аренда отвязывается от модератора, чтобы его следующая задача её не сняла, и больше не выдаётся
+        даже ему самому — backend до отправки решения может вернуть задачу снова.
+        """
+        self._drop_expired()
+        lease = self._leases.pop(user_task_id, None)
+        holder = 0
+        if lease is not None:
+            holder = lease.holder
+            self._forget(holder, user_task_id)
+        self._leases[user_task_id] = _Lease(holder, self._clock() + self.ttl, decided=True)
+        self.stats.decided += 1
+        _DECIDED.inc()
+
+    def holder(self, user_task_id: int) -> int | None:
+        self._drop_expired()
+        lease = self._leases.get(user_task_id)
+        return lease.holder if lease is not None else None
+
+    def _drop_expired(self) -> None:
+        now = self._clock()
+        while self._leases:
+            user_task_id, lease = next(iter(self._leases.items()))
+            if lease.expires_at > now:
+                break
+            del self._leases[user_task_id]
+            self._forget(lease.holder, user_task_id)
+            self.stats.expired += 1
+            _EXPIRED.inc()
+
+    def _forget(self, holder: int, user_task_id: int) -> None:
+        held = self._held.get(holder)
+        if held is not None:
+            held.discard(user_task_id)
+            if not held:
+                del self._held[holder]
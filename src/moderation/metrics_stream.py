@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import codecs
+import json
+from array import array
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+
+from src.utilities.metrics_columnar import UNKNOWN_TYPE, MetricsColumns, to_epoch_us
+from src.utilities.metrics_visualization import _normalize_metric_type, _to_utc
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonArrayStreamDecoder:
+    """
+    Инкрементальный разбор JSON-массива верхнего уровня: отдаёт элементы по мере поступления байтов.
+
+    В памяти держится только недочитанный хвост, а не весь ответ.
+    """
+
+    def __init__(self) -> None:
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._started = False
+        self._finished = False
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        self._buffer += self._text.decode(chunk)
+        return list(self._drain(final=False))
+
+    def close(self) -> list[Any]:
+        self._buffer += self._text.decode(b"", final=True)
+        items = list(self._drain(final=True))
+        if not self._finished:
+            raise ValueError("Unexpected end of JSON array")
+        return items
+
+    def _drain(self, *, final: bool) -> Iterator[Any]:
+        buffer = self._buffer
+        pos = _skip_whitespace(buffer, 0)
+
+        if not self._started:
+            if pos == len(buffer):
+                self._buffer = ""
+                return
+            if buffer[pos] != "[":
+                raise ValueError("Expected JSON array")
+            self._started = True
+            pos = _skip_whitespace(buffer, pos + 1)
+
+        while pos < len(buffer) and not self._finished:
+            if buffer[pos] == "]":
+                self._finished = True
+                pos += 1
+                break
+            if buffer[pos] == ",":
+                pos = _skip_whitespace(buffer, pos + 1)
+                continue
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            # Элемент в самом конце буфера может быть обрезан (например, число), ждём следующий кусок.
+            if end == len(buffer) and not final:
+                break
+            yield item
+            pos = _skip_whitespace(buffer, end)
+
+        if self._finished and buffer[pos:].strip(_WHITESPACE):
+            raise ValueError("Extra data after JSON array")
+        self._buffer = buffer[pos:]
+
+
+class MetricsColumnsBuilder:
+    """Складывает строки /api/metrics сразу в компактные буферы без промежуточных MetricModel."""
+
+    def __init__(self) -> None:
+        self._ids = array("q")
+        self._timestamps = array("q")
+        self._types = array("b")
+        self._users = array("i")
+        self._user_index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def append(self, row: dict[str, Any]) -> None:
+        try:
+            metric_id = int(row["id"])
+            username = str(row["username"])
+            ts = to_epoch_us(_to_utc(_parse_time(row["time"])))
+            metric_type = _normalize_metric_type(row["type"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid metric row {row!r}: {e}") from e
+
+        user = self._user_index.get(username)
+        if user is None:
+            user = self._user_index[username] = len(self._user_index)
+
+        self._ids.append(metric_id)
+        self._timestamps.append(ts)
+        self._types.append(metric_type.value if metric_type is not None else UNKNOWN_TYPE)
+        self._users.append(user)
+
+    def build(self) -> MetricsColumns:
+        return MetricsColumns(
+            ids=np.frombuffer(self._ids, dtype=np.int64),
+            timestamps=np.frombuffer(self._timestamps, dtype=np.int64),
+            types=np.frombuffer(self._types, dtype=np.int8),
+            users=np.frombuffer(self._users, dtype=np.int32),
+            usernames=list(self._user_index),
+        )
+
+
+class MetricsStreamDecoder:
+    """Потоковый декодер ответа /api/metrics в MetricsColumns."""
+
+    def __init__(self) -> None:
+        self._array = JsonArrayStreamDecoder()
+        self._builder = MetricsColumnsBuilder()
+
+    def feed(self, chunk: bytes) -> None:
+        for row in self._array.feed(chunk):
+            self._builder.append(row)
+
+    def finish(self) -> MetricsColumns:
+        for row in self._array.close():
+            self._builder.append(row)
+        return self._builder.build()
+
+
+def _parse_time(raw: Any) -> datetime:
+    if isinstance(raw, str):
+        return datetime.fromisoformat(raw)
+    if isinstance(raw, (int, float)) and not isinstance(raw, bool):
+        return datetime.fromtimestamp(raw, tz=timezone.utc)
+    raise TypeError(f"time must be a string, got {type(raw).__name__}")
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
@@ -1,6 +1,7 @@
 from .metrics import MetricModel, MetricsListModel, MetricType
 from .task import ModerationTask, PhotoModel, TaskExtendedInfo
 from .auth import ModeratorCheckResponse
+from .decision import BulkDecisionRequest, BulkDecisionResponse, Decision, DecisionAction, DecisionResult
 __all__ = [
     "MetricModel",
     "MetricsListModel",
@@ -9,4 +10,9 @@ __all__ = [
     "PhotoModel",
     "TaskExtendedInfo",
     "ModeratorCheckResponse",
+    "BulkDecisionRequest",
+    "BulkDecisionResponse",
+    "Decision",
+    "DecisionAction",
+    "DecisionResult",
 ]
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from enum import StrEnum
+
+from pydantic import BaseModel, ConfigDict
+
+
+class DecisionAction(StrEnum):
+    APPROVE = "approve"
+    REJECT = "reject"
+
+
+class Decision(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    userTaskId: int
+    action: DecisionAction
+
+
+class DecisionResult(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    userTaskId: int
+    ok: bool
+    error: str | None = None
+
+
+class BulkDecisionRequest(BaseModel):
+    decisions: list[Decision]
+
+
+class BulkDecisionResponse(BaseModel):
+    results: list[DecisionResult]
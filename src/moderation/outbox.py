@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from src.moderation.client import ModerationClient
+from src.moderation.models import Decision, DecisionAction, DecisionResult
+
+T = TypeVar("T")
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS decision_outbox (
+    user_task_id INTEGER PRIMARY KEY,
+    action TEXT NOT NULL,
+    chat_id INTEGER,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    error TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+@dataclass
+class OutboxEntry:
+    user_task_id: int
+    action: DecisionAction
+    chat_id: int | None
+    attempts: int
+
+
+@dataclass
+class OutboxStats:
+    queued: int = 0
+    duplicates: int = 0
+    sent: int = 0
+    retries: int = 0
+    failed: int = 0
+
+
+FailureCallback = Callable[[OutboxEntry, str], Awaitable[None]]
+SettledCallback = Callable[[int], None]
+
+
+class DecisionOutbox:
+    """
+    Write-behind отправка решений модераторов через персистентный outbox в SQLite.
+
+    Решение сначала записывается в outbox (ключ — user_task_id, поэтому повторное нажатие не создаёт
+    второе решение), а фоновый воркер отправляет накопившиеся решения bulk-запросом и повторяет неудачные
+    с экспоненциальной задержкой. После max_attempts неудач вызывается on_failure. on_settled получает
+    user_task_id каждого решения, которое отправлено или брошено после всех попыток. Завершённые записи
+    хранятся ttl секунд, чтобы повторные нажатия в это время тоже отбрасывались.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        client: ModerationClient,
+        *,
+        max_attempts: int = 5,
+        retry_base_delay: float = 2.0,
+        retry_max_delay: float = 300.0,
+        batch_size: int = 50,
+        ttl: float = 24 * 3600,
+        poll_interval: float = 5.0,
+    ):
+        self.path = path
+        self.client = client
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.batch_size = max(1, batch_size)
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.on_failure: FailureCallback | None = None
+        self.on_settled: SettledCallback | None = None
+        self.stats = OutboxStats()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="decision-outbox")
+        self._conn: sqlite3.Connection | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._worker())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._run(self._close_connection)
+        self._executor.shutdown(wait=True)
+
+    async def enqueue(
+        self, user_task_id: int, action: DecisionAction, chat_id: int | None = None
+    ) -> DecisionAction:
+        """
+        Сохраняет решение. Возвращает действие, которое теперь лежит в outbox по этой задаче:
+        если решение по ней уже было, это сохранённое раньше действие, и оно может отличаться от action.
+        """
+        return (await self.enqueue_many([Decision(userTaskId=user_task_id, action=action)], chat_id))[0]
+
+    async def enqueue_many(self, decisions: list[Decision], chat_id: int | None = None) -> list[DecisionAction]:
+        rows = await self._run(self._insert, decisions, chat_id, time.time())
+        inserted = sum(1 for is_new, _ in rows if is_new)
+        self.stats.queued += inserted
+        self.stats.duplicates += len(rows) - inserted
+        if inserted:
+            self._wakeup.set()
+        return [stored for _, stored in rows]
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                # Сбрасываем до выборки: решение, сохранённое во время выборки, снова взведёт событие.
+                self._wakeup.clear()
+                entries = await self._run(self._claim_due, time.time(), self.batch_size)
+                if entries:
+                    await self._send(entries)
+                    continue
+                next_due = await self._run(self._next_due)
+                timeout = self.poll_interval if next_due is None else max(0.0, next_due - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), min(timeout, self.poll_interval))
+                except asyncio.TimeoutError:
+                    await self._run(self._delete_expired, time.time() - self.ttl)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in decision outbox worker: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _send(self, entries: list[OutboxEntry]) -> None:
+        decisions = [Decision(userTaskId=entry.user_task_id, action=entry.action) for entry in entries]
+        try:
+            results = await self.client.bulk_decide(decisions)
+        except Exception as e:
+            results = [DecisionResult(userTaskId=d.userTaskId, ok=False, error=str(e)) for d in decisions]
+        by_id = {result.userTaskId: result for result in results}
+
+        now = time.time()
+        done: list[int] = []
+        retry: list[tuple[float, str, int]] = []
+        failed: list[tuple[OutboxEntry, str]] = []
+        for entry in entries:
+            result = by_id.get(entry.user_task_id)
+            if result is not None and result.ok:
+                done.append(entry.user_task_id)
+                continue
+            error = (result.error if result is not None else None) or "Нет результата от backend"
+            entry.attempts += 1
+            if entry.attempts >= self.max_attempts:
+                failed.append((entry, error))
+            else:
+                retry.append((now + self._backoff(entry.attempts), error, entry.user_task_id))
+
+        await self._run(self._update, done, retry, [(error, entry.user_task_id) for entry, error in failed], now)
+        self.stats.sent += len(done)
+        self.stats.retries += len(retry)
+        self.stats.failed += len(failed)
+        if self.on_settled is not None:
+            for user_task_id in done + [entry.user_task_id for entry, _ in failed]:
+                self.on_settled(user_task_id)
+        for entry, error in failed:
+            print(f"Decision {entry.action} for task {entry.user_task_id} failed: {error}")
+            if self.on_failure is not None:
+                try:
+                    await self.on_failure(entry, error)
+                except Exception as e:
+                    print(f"Error reporting failed decision for task {entry.user_task_id}: {e}")
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # Методы ниже выполняются только в потоке self._executor.
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS decision_outbox_due ON decision_outbox (status, next_attempt_at)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _insert(
+        self, decisions: list[Decision], chat_id: int | None, now: float
+    ) -> list[tuple[bool, DecisionAction]]:
+        """Для каждого решения: вставлено ли оно и какое действие хранится по задаче после вставки."""
+        conn = self._connection()
+        rows: list[tuple[bool, DecisionAction]] = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for decision in decisions:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO decision_outbox "
+                    "(user_task_id, action, chat_id, status, next_attempt_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (decision.userTaskId, decision.action.value, chat_id, PENDING, now, now),
+                )
+                if cursor.rowcount == 1:
+                    rows.append((True, decision.action))
+                    continue
+                stored = conn.execute(
+                    "SELECT action FROM decision_outbox WHERE user_task_id = ?", (decision.userTaskId,)
+                ).fetchone()
+                rows.append((False, DecisionAction(stored[0])))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return rows
+
+    def _claim_due(self, now: float, limit: int) -> list[OutboxEntry]:
+        rows = self._connection().execute(
+            "SELECT user_task_id, action, chat_id, attempts FROM decision_outbox "
+            "WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+            (PENDING, now, limit),
+        ).fetchall()
+        return [OutboxEntry(row[0], DecisionAction(row[1]), row[2], row[3]) for row in rows]
+
+    def _next_due(self) -> float | None:
+        row = self._connection().execute(
+            "SELECT MIN(next_attempt_at) FROM decision_outbox WHERE status = ?", (PENDING,)
+        ).fetchone()
+        return row[0]
+
+    def _update(
+        self,
+        done: list[int],
+        retry: list[tuple[float, str, int]],
+        failed: list[tuple[str, int]],
+        now: float,
+    ) -> None:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE decision_outbox SET status = ?, error = NULL, updated_at = ? WHERE user_task_id = ?",
+                [(DONE, now, user_task_id) for user_task_id in done],
+            )
+            conn.executemany(
+                "UPDATE decision_outbox SET attempts = attempts + 1, next_attempt_at = ?, error = ?, updated_at = ? "
+                "WHERE user_task_id = ?",
+                [(next_attempt_at, error, now, user_task_id) for next_attempt_at, error, user_task_id in retry],
+            )
+            conn.executemany(
+                "UPDATE decision_outbox SET status = ?, attempts = attempts + 1, error = ?, updated_at = ? "
+                "WHERE user_task_id = ?",
+                [(FAILED, error, now, user_task_id) for error, user_task_id in failed],
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _delete_expired(self, deadline: float) -> None:
+        self._connection().execute(
+            "DELETE FROM decision_outbox WHERE status IN (?, ?) AND updated_at < ?", (DONE, FAILED, deadline)
+        )
+
+    def _close_connection(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.moderation.client import ModerationClient
+from src.moderation.models import ModerationTask
+
+
+@dataclass
+class _PrefetchedTask:
+    task: ModerationTask
+    fetched_at: float
+
+
+@dataclass
+class PrefetchStats:
+    served_from_buffer: int = 0
+    served_directly: int = 0
+    expired: int = 0
+    fetch_errors: int = 0
+    skipped_seen: int = 0
+
+
+class TaskPrefetcher:
+    """
+    Держит небольшой буфер задач из ModerationClient.next() и дозаполняет его в фоне.
+
+    Задачи старше lease_timeout выбрасываются: к этому моменту backend
+    мог уже отдать их другому модератору.
+
+    Backend отдаёт задачу снова, пока по ней нет решения, поэтому выданные и решённые задачи
+    запоминаются на lease_timeout и при дозаполнении пропускаются; решённые убираются и из буфера.
+    """
+
+    def __init__(
+        self,
+        client: ModerationClient,
+        *,
+        size: int = 2,
+        lease_timeout: float = 120.0,
+        empty_backoff: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.size = max(0, size)
+        self.lease_timeout = lease_timeout
+        self.empty_backoff = empty_backoff
+        self.stats = PrefetchStats()
+        self._clock = clock
+        self._buffer: deque[_PrefetchedTask] = deque()
+        # userTaskId выданных или решённых задач -> когда запомнили; порядок совпадает с порядком истечения.
+        self._seen: OrderedDict[int, float] = OrderedDict()
+        self._refill_task: asyncio.Task[None] | None = None
+        self._paused_until = 0.0
+        self._closed = False
+
+    def __len__(self) -> int:
+        self._drop_expired()
+        return len(self._buffer)
+
+    async def next(self) -> ModerationTask | None:
+        self._drop_expired()
+        if self._buffer:
+            entry = self._buffer.popleft()
+            self.stats.served_from_buffer += 1
+            self._remember(entry.task.userTaskId)
+            self._schedule_refill()
+            return entry.task
+
+        task = await self.client.next()
+        self.stats.served_directly += 1
+        if task is not None:
+            self._remember(task.userTaskId)
+            self._schedule_refill()
+        return task
+
+    def discard(self, user_task_id: int) -> None:
+        """Отмечает задачу решённой: она уходит из буфера и не попадёт в него снова."""
+        self._buffer = deque(entry for entry in self._buffer if entry.task.userTaskId != user_task_id)
+        self._remember(user_task_id)
+
+    async def close(self) -> None:
+        self._closed = True
+        self._buffer.clear()
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+
+    def _schedule_refill(self) -> None:
+        if self._closed or self.size == 0 or self._clock() < self._paused_until:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        while not self._closed and len(self._buffer) < self.size:
+            try:
+                task = await self.client.next()
+            except Exception as e:
+                self.stats.fetch_errors += 1
+                print(f"Error prefetching moderation task: {e}")
+                self._paused_until = self._clock() + self.empty_backoff
+                return
+
+            # Пустая очередь, уже выданная или решённая задача, повтор буферизованной — новых задач нет.
+            if task is None or task.userTaskId in self._seen:
+                if task is not None:
+                    self.stats.skipped_seen += 1
+                self._paused_until = self._clock() + self.empty_backoff
+                return
+            if any(entry.task.userTaskId == task.userTaskId for entry in self._buffer):
+                self._paused_until = self._clock() + self.empty_backoff
+                return
+
+            self._buffer.append(_PrefetchedTask(task=task, fetched_at=self._clock()))
+
+    def _remember(self, user_task_id: int) -> None:
+        self._seen.pop(user_task_id, None)
+        self._seen[user_task_id] = self._clock()
+
+    def _drop_expired(self) -> None:
+        deadline = self._clock() - self.lease_timeout
+        while self._buffer and self._buffer[0].fetched_at < deadline:
+            self._buffer.popleft()
+            self.stats.expired += 1
+        while self._seen:
+            user_task_id, seen_at = next(iter(self._seen.items()))
+            if seen_at >= deadline:
+                break
+            del self._seen[user_task_id]
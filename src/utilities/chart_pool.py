@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.utilities.metrics_visualization import ChartData, render_chart, warm_up_chart_renderer
+
+
+def _warm_up_worker(renderer: str) -> None:
+    # Импорт бэкенда (особенно pyplot) занимает заметное время, поэтому делаем его при старте процесса.
+    warm_up_chart_renderer(renderer)
+
+
+class ChartRenderPool:
+    """
+    Отрисовка диаграмм метрик в отдельных процессах, чтобы matplotlib не блокировал event loop.
+
+    Одновременно рендерится не больше max_concurrency графиков; каждый ждёт не дольше timeout секунд.
+    """
+
+    def __init__(
+        self, max_workers: int = 1, max_concurrency: int = 2, timeout: float = 30.0, renderer: str = "matplotlib"
+    ):
+        self.max_workers = max(1, max_workers)
+        self.renderer = renderer
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def render(self, chart: ChartData) -> bytes:
+        """Возвращает PNG; при превышении timeout бросает asyncio.TimeoutError."""
+        return await asyncio.wait_for(self._render(chart), self.timeout)
+
+    async def warm_up(self) -> None:
+        """Запускает процесс пула заранее, чтобы первый /metrics не ждал его старта и импорта pyplot."""
+        await asyncio.get_running_loop().run_in_executor(self._get_executor(), _warm_up_worker, self.renderer)
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _render(self, chart: ChartData) -> bytes:
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._get_executor(), render_chart, chart, self.renderer)
+            except BrokenProcessPool:
+                # Воркер упал (например, по OOM) — пересоздаём пул при следующем вызове.
+                self._executor = None
+                raise
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up_worker,
+                initargs=(self.renderer,),
+            )
+        return self._executor
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class FileIdCacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+
+class FileIdCache:
+    """
+    LRU-кэш URL → Telegram file_id для фотографий задач.
+
+    Повторная отправка по file_id не заставляет Telegram заново скачивать фото из хранилища.
+    Если задан path, кэш загружается с диска при создании и сохраняется при save().
+    """
+
+    def __init__(self, max_size: int = 5000, path: str | Path | None = None, save_every: int = 50):
+        self.max_size = max(1, max_size)
+        self.path = Path(path) if path else None
+        self.save_every = max(1, save_every)
+        self.stats = FileIdCacheStats()
+        self._items: OrderedDict[str, str] = OrderedDict()
+        self._unsaved = 0
+        if self.path is not None:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, url: object) -> bool:
+        return url in self._items
+
+    def get(self, url: str) -> str | None:
+        file_id = self._items.get(url)
+        if file_id is None:
+            self.stats.misses += 1
+            return None
+        self._items.move_to_end(url)
+        self.stats.hits += 1
+        return file_id
+
+    def put(self, url: str, file_id: str) -> None:
+        if self._items.get(url) == file_id:
+            self._items.move_to_end(url)
+            return
+        self._items[url] = file_id
+        self._items.move_to_end(url)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        self._mark_dirty()
+
+    def invalidate(self, url: str) -> None:
+        if self._items.pop(url, None) is not None:
+            self.stats.invalidations += 1
+            self._mark_dirty()
+
+    def save(self) -> None:
+        if self.path is None or self._unsaved == 0:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(list(self._items.items()), f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+    async def close(self) -> None:
+        self.save()
+
+    def _mark_dirty(self) -> None:
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def _load(self) -> None:
+        assert self.path is not None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Error loading file_id cache {self.path}: {e}")
+            return
+
+        for url, file_id in items[-self.max_size :]:
+            self._items[url] = file_id
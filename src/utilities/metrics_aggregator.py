@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from src.moderation.models import MetricModel, MetricType
+from src.utilities.metrics_columnar import EPOCH, MetricsColumns, to_epoch_us
+from src.utilities.metrics_visualization import (
+    ChartData,
+    MetricsAggregate,
+    MetricsSummary,
+    _normalize_metric_type,
+    _to_utc,
+    _week_label,
+)
+from src.utilities.quantiles import KllSketch
+
+
+@dataclass
+class _DayState:
+    submit_count: int = 0
+    change_count: int = 0
+    submit_minutes: float = 0.0
+    # Интервалы между сдачами учитываются в дне предыдущей сдачи: интервал попадает в окно,
+    # только если обе сдачи внутри окна, а окно всегда начинается с полуночи.
+    between_minutes: float = 0.0
+    between_count: int = 0
+    submit_minutes_sketch: KllSketch = field(default_factory=KllSketch)
+    between_sketch: KllSketch = field(default_factory=KllSketch)
+
+
+@dataclass
+class _WeekState:
+    submit_count: int = 0
+    change_count: int = 0
+    users: set[str] = field(default_factory=set)
+    submit_users: set[str] = field(default_factory=set)
+    change_users: set[str] = field(default_factory=set)
+
+
+class EventWatermark:
+    """
+    Водяной знак уже учтённых событий: время последнего события и id событий с этим временем.
+
+    События с одинаковым временем могут приходить в разных выгрузках, поэтому одного времени мало.
+    """
+
+    def __init__(self) -> None:
+        self.time: datetime | None = None
+        self.ids: set[int] = set()
+
+    def is_new(self, ts: datetime, metric_id: int) -> bool:
+        if self.time is None or ts > self.time:
+            return True
+        return ts == self.time and metric_id not in self.ids
+
+    def new_mask(self, columns: MetricsColumns) -> np.ndarray:
+        if self.time is None:
+            return np.ones(len(columns), dtype=bool)
+        watermark = to_epoch_us(self.time)
+        seen = np.fromiter(self.ids, dtype=np.int64, count=len(self.ids))
+        return (columns.timestamps > watermark) | ((columns.timestamps == watermark) & ~np.isin(columns.ids, seen))
+
+    def advance(self, ts: datetime, metric_id: int) -> None:
+        if self.time is None or ts > self.time:
+            self.time = ts
+            self.ids = set()
+        self.ids.add(metric_id)
+
+
+def fresh_column_events(
+    columns: MetricsColumns, cutoff: datetime, watermark: EventWatermark
+) -> list[tuple[datetime, int, str, MetricType]]:
+    """События известного типа не раньше cutoff и новее водяного знака, отсортированные по (время, id)."""
+    mask = (columns.types >= 0) & (columns.timestamps >= to_epoch_us(cutoff)) & watermark.new_mask(columns)
+    fresh = [
+        (
+            EPOCH + timedelta(microseconds=int(columns.timestamps[i])),
+            int(columns.ids[i]),
+            columns.usernames[columns.users[i]],
+            MetricType(int(columns.types[i])),
+        )
+        for i in np.flatnonzero(mask)
+    ]
+    fresh.sort(key=lambda event: (event[0], event[1]))
+    return fresh
+
+
+class RollingMetricsAggregator:
+    """
+    Инкрементальный аналог aggregate_metrics.
+
+    Хранит по дням и неделям счётчики, множества пользователей и время последней сдачи
+    каждого пользователя, поэтому обновление стоит O(новых событий), а не O(всех событий).
+    Новыми считаются события позже водяного знака (время, id); более ранние события
+    (пришедшие с опозданием) пропускаются. Дни и недели вне окна вытесняются.
+    """
+
+    def __init__(self, weeks: int = 4):
+        self.weeks = max(1, weeks)
+        self._days: dict[date, _DayState] = {}
+        self._weeks: dict[date, _WeekState] = {}
+        self._last_submit: dict[str, datetime] = {}
+        self._watermark = EventWatermark()
+
+    def ingest(self, metrics: Iterable[MetricModel], *, now: datetime | None = None) -> int:
+        """Добавляет события новее водяного знака; возвращает число принятых событий."""
+        cutoff = _start_of_day(self._cutoff_date(now or datetime.now(timezone.utc)))
+        fresh: list[tuple[datetime, int, str, MetricType]] = []
+        for metric in metrics:
+            ts = _to_utc(metric.time)
+            if not self._watermark.is_new(ts, metric.id):
+                continue
+            metric_type = _normalize_metric_type(metric.type)
+            if metric_type is None or ts < cutoff:
+                continue
+            fresh.append((ts, metric.id, metric.username, metric_type))
+
+        fresh.sort(key=lambda event: (event[0], event[1]))
+        return self._ingest_fresh(fresh)
+
+    def ingest_columns(self, columns: MetricsColumns, *, now: datetime | None = None) -> int:
+        """То же, что ingest, но отбор новых событий делается векторно по колонкам."""
+        cutoff = _start_of_day(self._cutoff_date(now or datetime.now(timezone.utc)))
+        return self._ingest_fresh(fresh_column_events(columns, cutoff, self._watermark))
+
+    def _ingest_fresh(self, fresh: list[tuple[datetime, int, str, MetricType]]) -> int:
+        for ts, metric_id, username, metric_type in fresh:
+            self._apply(ts, username, metric_type)
+            self._watermark.advance(ts, metric_id)
+        return len(fresh)
+
+    def snapshot(self, now: datetime | None = None) -> MetricsAggregate:
+        now = now or datetime.now(timezone.utc)
+        self.evict(now)
+        return MetricsAggregate(summary=self._summary(now), chart=self._chart(now))
+
+    def evict(self, now: datetime) -> None:
+        cutoff_date = self._cutoff_date(now)
+        cutoff = _start_of_day(cutoff_date)
+        self._days = {day: state for day, state in self._days.items() if day >= cutoff_date}
+        self._weeks = {week: state for week, state in self._weeks.items() if week >= _week_start(cutoff_date)}
+        self._last_submit = {user: ts for user, ts in self._last_submit.items() if ts >= cutoff}
+
+    def _apply(self, ts: datetime, username: str, metric_type: MetricType) -> None:
+        day = self._days.setdefault(ts.date(), _DayState())
+        week = self._weeks.setdefault(_week_start(ts.date()), _WeekState())
+        week.users.add(username)
+
+        if metric_type == MetricType.Submit:
+            minute_of_day = ts.hour * 60 + ts.minute + ts.second / 60
+            day.submit_count += 1
+            day.submit_minutes += minute_of_day
+            day.submit_minutes_sketch.update(minute_of_day)
+            week.submit_count += 1
+            week.submit_users.add(username)
+
+            previous = self._last_submit.get(username)
+            if previous is not None:
+                previous_day = self._days.get(previous.date())
+                if previous_day is not None:
+                    between = (ts - previous).total_seconds() / 60
+                    previous_day.between_minutes += between
+                    previous_day.between_count += 1
+                    previous_day.between_sketch.update(between)
+            self._last_submit[username] = ts
+        elif metric_type == MetricType.Change:
+            day.change_count += 1
+            week.change_count += 1
+            week.change_users.add(username)
+
+    def _summary(self, now: datetime) -> MetricsSummary:
+        start_date = now.date() - timedelta(days=6)
+        days = [state for day, state in self._days.items() if day >= start_date]
+        submit_count = sum(day.submit_count for day in days)
+        change_count = sum(day.change_count for day in days)
+        submit_minutes = sum(day.submit_minutes for day in days)
+        between_minutes = sum(day.between_minutes for day in days)
+        between_count = sum(day.between_count for day in days)
+
+        start = _start_of_day(start_date)
+        user_count = sum(1 for ts in self._last_submit.values() if ts >= start)
+
+        return MetricsSummary(
+            average_submissions_per_user=submit_count / user_count if user_count else 0.0,
+            change_percent=(change_count / submit_count * 100) if submit_count else 0.0,
+            average_submit_minutes=submit_minutes / submit_count if submit_count else None,
+            average_between_submits_minutes=between_minutes / between_count if between_count else None,
+            submit_count=submit_count,
+            change_count=change_count,
+            user_count=user_count,
+            submit_minutes_percentiles=KllSketch.merged(day.submit_minutes_sketch for day in days).percentiles(),
+            between_submits_percentiles=KllSketch.merged(day.between_sketch for day in days).percentiles(),
+        )
+
+    def _chart(self, now: datetime) -> ChartData:
+        chart = ChartData([], [], [], [], [], [], [])
+        first_week = self._chart_start_date(now)
+        for i in range(self.weeks):
+            week_start = first_week + timedelta(days=7 * i)
+            state = self._weeks.get(week_start) or _WeekState()
+            total = state.submit_count + state.change_count
+            chart.labels.append(_week_label(week_start))
+            chart.submit_counts.append(state.submit_count)
+            chart.change_counts.append(state.change_count)
+            chart.total_counts.append(total)
+            chart.avg_per_user.append(_per_user(total, state.users))
+            chart.avg_submit_per_user.append(_per_user(state.submit_count, state.submit_users))
+            chart.avg_change_per_user.append(_per_user(state.change_count, state.change_users))
+        return chart
+
+    def _chart_start_date(self, now: datetime) -> date:
+        return _week_start(now.date()) - timedelta(days=7 * (self.weeks - 1))
+
+    def _cutoff_date(self, now: datetime) -> date:
+        return min(now.date() - timedelta(days=6), self._chart_start_date(now))
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _start_of_day(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+
+
+def _per_user(total: int, users: set[str]) -> float:
+    return total / len(users) if users else 0.0
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from src.moderation.models import MetricModel, MetricType
+from src.utilities.metrics_visualization import (
+    ChartData,
+    MetricsAggregate,
+    MetricsSummary,
+    _normalize_metric_type,
+    _to_utc,
+    _week_label,
+)
+from src.utilities.quantiles import KllSketch
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+US_PER_SECOND = 1_000_000
+US_PER_DAY = 86_400 * US_PER_SECOND
+UNKNOWN_TYPE = -1
+
+
+@dataclass
+class MetricsColumns:
+    """
+    Метрики в колоночном виде.
+
+    timestamps — микросекунды от epoch (UTC), types — код MetricType (-1 для неизвестного типа),
+    users — индекс в таблице usernames.
+    """
+
+    ids: np.ndarray
+    timestamps: np.ndarray
+    types: np.ndarray
+    users: np.ndarray
+    usernames: list[str]
+
+    def __len__(self) -> int:
+        return int(self.timestamps.shape[0])
+
+    @classmethod
+    def from_models(cls, metrics: Sequence[MetricModel]) -> MetricsColumns:
+        size = len(metrics)
+        ids = np.empty(size, dtype=np.int64)
+        timestamps = np.empty(size, dtype=np.int64)
+        types = np.empty(size, dtype=np.int8)
+        users = np.empty(size, dtype=np.int32)
+        user_index: dict[str, int] = {}
+
+        for i, metric in enumerate(metrics):
+            ids[i] = metric.id
+            timestamps[i] = to_epoch_us(_to_utc(metric.time))
+            metric_type = _normalize_metric_type(metric.type)
+            types[i] = metric_type.value if metric_type is not None else UNKNOWN_TYPE
+            users[i] = user_index.setdefault(metric.username, len(user_index))
+
+        return cls(ids=ids, timestamps=timestamps, types=types, users=users, usernames=list(user_index))
+
+
+def to_epoch_us(dt: datetime) -> int:
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def aggregate_columns(columns: MetricsColumns, *, now: datetime | None = None, weeks: int = 4) -> MetricsAggregate:
+    """
+    Векторизованный аналог aggregate_metrics: тот же MetricsSummary и те же ряды диаграммы.
+    """
+    now = now or datetime.now(timezone.utc)
+    weeks = max(1, weeks)
+
+    summary_start = to_epoch_us(datetime.combine(now.date() - timedelta(days=6), datetime.min.time(), EPOCH.tzinfo))
+    in_summary = columns.timestamps >= summary_start
+    submit_mask = in_summary & (columns.types == MetricType.Submit.value)
+    change_mask = in_summary & (columns.types == MetricType.Change.value)
+    summary = _summary(
+        columns.timestamps[submit_mask],
+        columns.users[submit_mask],
+        int(np.count_nonzero(change_mask)),
+    )
+
+    chart_start_date = now.date() - timedelta(days=now.weekday() + 7 * (weeks - 1))
+    chart = _weekly_chart(columns, chart_start_date, weeks)
+    return MetricsAggregate(summary=summary, chart=chart)
+
+
+def _summary(submit_ts: np.ndarray, submit_users: np.ndarray, change_count: int) -> MetricsSummary:
+    submit_count = int(submit_ts.shape[0])
+    user_count = int(np.unique(submit_users).shape[0])
+
+    average_submit_minutes = None
+    submit_sketch = KllSketch()
+    if submit_count:
+        minutes_of_day = ((submit_ts // US_PER_SECOND) % 86_400) / 60
+        average_submit_minutes = float(minutes_of_day.sum() / submit_count)
+        submit_sketch.update_many(minutes_of_day.tolist())
+
+    average_between = None
+    between_sketch = KllSketch()
+    if submit_count >= 2:
+        order = np.lexsort((submit_ts, submit_users))
+        users_sorted = submit_users[order]
+        ts_sorted = submit_ts[order]
+        same_user = users_sorted[1:] == users_sorted[:-1]
+        deltas = (ts_sorted[1:] - ts_sorted[:-1])[same_user] / (60 * US_PER_SECOND)
+        if deltas.shape[0]:
+            average_between = float(deltas.sum() / deltas.shape[0])
+            between_sketch.update_many(deltas.tolist())
+
+    return MetricsSummary(
+        average_submissions_per_user=submit_count / user_count if user_count else 0.0,
+        change_percent=(change_count / submit_count * 100) if submit_count else 0.0,
+        average_submit_minutes=average_submit_minutes,
+        average_between_submits_minutes=average_between,
+        submit_count=submit_count,
+        change_count=change_count,
+        user_count=user_count,
+        submit_minutes_percentiles=submit_sketch.percentiles(),
+        between_submits_percentiles=between_sketch.percentiles(),
+    )
+
+
+def _weekly_chart(columns: MetricsColumns, start_week_date: date, weeks: int) -> ChartData:
+    start_day = (start_week_date - EPOCH.date()).days
+    week_index = (columns.timestamps // US_PER_DAY - start_day) // 7
+    known = (columns.types == MetricType.Submit.value) | (columns.types == MetricType.Change.value)
+    in_range = known & (week_index >= 0) & (week_index < weeks)
+
+    week_index = week_index[in_range]
+    types = columns.types[in_range]
+    users = columns.users[in_range]
+    is_submit = types == MetricType.Submit.value
+    is_change = types == MetricType.Change.value
+
+    user_space = max(len(columns.usernames), 1)
+    submit_counts = np.bincount(week_index[is_submit], minlength=weeks)
+    change_counts = np.bincount(week_index[is_change], minlength=weeks)
+    total_counts = np.bincount(week_index, minlength=weeks)
+    users_per_week = _distinct_per_week(week_index, users, weeks, user_space)
+    submit_users = _distinct_per_week(week_index[is_submit], users[is_submit], weeks, user_space)
+    change_users = _distinct_per_week(week_index[is_change], users[is_change], weeks, user_space)
+
+    return ChartData(
+        labels=[_week_label(start_week_date + timedelta(days=7 * i)) for i in range(weeks)],
+        submit_counts=submit_counts.tolist(),
+        change_counts=change_counts.tolist(),
+        total_counts=total_counts.tolist(),
+        avg_per_user=_per_user(total_counts, users_per_week),
+        avg_submit_per_user=_per_user(submit_counts, submit_users),
+        avg_change_per_user=_per_user(change_counts, change_users),
+    )
+
+
+def _distinct_per_week(week_index: np.ndarray, users: np.ndarray, weeks: int, user_space: int) -> np.ndarray:
+    keys = np.unique(week_index * user_space + users)
+    return np.bincount(keys // user_space, minlength=weeks)
+
+
+def _per_user(counts: np.ndarray, users: np.ndarray) -> list[float]:
+    return [total / user_count if user_count else 0.0 for total, user_count in zip(counts.tolist(), users.tolist())]
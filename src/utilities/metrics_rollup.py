@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import enum
+import functools
+import hashlib
+import math
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from src.moderation.models import MetricModel, MetricType
+from src.utilities.metrics_aggregator import EventWatermark, fresh_column_events
+from src.utilities.metrics_columnar import MetricsColumns
+from src.utilities.metrics_visualization import (
+    ChartData,
+    MetricsAggregate,
+    MetricsSummary,
+    _normalize_metric_type,
+    _to_utc,
+    _week_label,
+)
+from src.utilities.quantiles import KllSketch
+
+SKETCH_PRECISION = 12
+SKETCH_REGISTERS = 1 << SKETCH_PRECISION
+# Разреженный словарь дороже плотного массива примерно после стольких заполненных регистров.
+SPARSE_LIMIT = SKETCH_REGISTERS // 8
+_RANK_BITS = 64 - SKETCH_PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / SKETCH_REGISTERS)
+
+
+@functools.lru_cache(maxsize=65536)
+def _user_hash(username: str) -> int:
+    # hash() для строк рандомизирован между процессами, а скетчи должны сливаться одинаково.
+    return int.from_bytes(hashlib.blake2b(username.encode(), digest_size=8).digest(), "big")
+
+
+class DistinctSketch:
+    """
+    HyperLogLog-скетч числа различных пользователей (погрешность ~1.6%).
+
+    Пока заполнено мало регистров, они хранятся словарём: в обычный день пользователей немного,
+    и плотный массив на каждый день тратил бы память впустую. Для малых значений оценка идёт
+    линейным подсчётом, поэтому почти точна.
+    """
+
+    __slots__ = ("_sparse", "_dense")
+
+    def __init__(self) -> None:
+        self._sparse: dict[int, int] | None = {}
+        self._dense: np.ndarray | None = None
+
+    def add(self, username: str) -> None:
+        h = _user_hash(username)
+        register = h >> _RANK_BITS
+        rank = _RANK_BITS - (h & ((1 << _RANK_BITS) - 1)).bit_length() + 1
+        if self._sparse is not None:
+            if rank > self._sparse.get(register, 0):
+                self._sparse[register] = rank
+                if len(self._sparse) > SPARSE_LIMIT:
+                    self._densify()
+        else:
+            assert self._dense is not None
+            if rank > self._dense[register]:
+                self._dense[register] = rank
+
+    @classmethod
+    def union(cls, sketches: Iterable[DistinctSketch]) -> DistinctSketch:
+        result = cls()
+        for sketch in sketches:
+            result.update(sketch)
+        return result
+
+    def update(self, other: DistinctSketch) -> None:
+        if other._sparse is not None:
+            if self._sparse is not None:
+                for register, rank in other._sparse.items():
+                    if rank > self._sparse.get(register, 0):
+                        self._sparse[register] = rank
+                if len(self._sparse) > SPARSE_LIMIT:
+                    self._densify()
+            elif other._sparse:
+                assert self._dense is not None
+                registers = np.fromiter(other._sparse.keys(), dtype=np.int64, count=len(other._sparse))
+                ranks = np.fromiter(other._sparse.values(), dtype=np.uint8, count=len(other._sparse))
+                np.maximum.at(self._dense, registers, ranks)
+            return
+        if self._sparse is not None:
+            self._densify()
+        # Ровно одно из _sparse/_dense задано, поэтому здесь оба скетча плотные.
+        assert self._dense is not None and other._dense is not None
+        np.maximum(self._dense, other._dense, out=self._dense)
+
+    def estimate(self) -> int:
+        if self._sparse is not None:
+            filled = len(self._sparse)
+            if filled == 0:
+                return 0
+            if filled < SKETCH_REGISTERS:
+                return round(SKETCH_REGISTERS * math.log(SKETCH_REGISTERS / (SKETCH_REGISTERS - filled)))
+            registers = np.zeros(SKETCH_REGISTERS, dtype=np.uint8)
+        else:
+            assert self._dense is not None
+            registers = self._dense
+        raw = _ALPHA * SKETCH_REGISTERS**2 / float(np.ldexp(1.0, -registers.astype(np.int32)).sum())
+        zeros = int(np.count_nonzero(registers == 0))
+        if raw <= 2.5 * SKETCH_REGISTERS and zeros:
+            return round(SKETCH_REGISTERS * math.log(SKETCH_REGISTERS / zeros))
+        return round(raw)
+
+    def _densify(self) -> None:
+        dense = np.zeros(SKETCH_REGISTERS, dtype=np.uint8)
+        for register, rank in (self._sparse or {}).items():
+            dense[register] = rank
+        self._dense = dense
+        self._sparse = None
+
+
+class Granularity(str, enum.Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+@dataclass
+class _DayRollup:
+    submit_count: int = 0
+    change_count: int = 0
+    submit_minutes: float = 0.0
+    # Интервал между сдачами относится ко дню предыдущей сдачи, как в RollingMetricsAggregator.
+    between_minutes: float = 0.0
+    between_count: int = 0
+    users: DistinctSketch = field(default_factory=DistinctSketch)
+    submit_users: DistinctSketch = field(default_factory=DistinctSketch)
+    change_users: DistinctSketch = field(default_factory=DistinctSketch)
+    submit_minutes_sketch: KllSketch = field(default_factory=KllSketch)
+    between_sketch: KllSketch = field(default_factory=KllSketch)
+    # Сдачи по пользователям; хранятся только за последние exact_days дней.
+    user_submits: Counter[str] | None = field(default_factory=Counter)
+
+
+class MetricsRollup:
+    """
+    Индекс метрик, предагрегированных по дням, для /metrics за произвольный период.
+
+    На каждый день хранятся счётчики, скетчи различных пользователей, скетчи квантилей (время сдачи
+    и интервалы между сдачами) и сдачи по пользователям, поэтому сводка и диаграмма по дням, неделям
+    или месяцам собираются слиянием O(дней) строк, а не повторным проходом по сырым событиям. Число
+    пользователей в сводке считается точно по сдачам пользователей, если весь период укладывается
+    в exact_days, иначе — по скетчам. Дни старше retention_days вытесняются.
+    """
+
+    def __init__(self, *, retention_days: int = 400, exact_days: int = 62):
+        self.retention_days = max(1, retention_days)
+        self.exact_days = max(0, exact_days)
+        self._days: dict[date, _DayRollup] = {}
+        self._last_submit: dict[str, datetime] = {}
+        self._watermark = EventWatermark()
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def ingest(self, metrics: Iterable[MetricModel], *, now: datetime | None = None) -> int:
+        cutoff = self._cutoff(now or datetime.now(timezone.utc))
+        fresh: list[tuple[datetime, int, str, MetricType]] = []
+        for metric in metrics:
+            ts = _to_utc(metric.time)
+            metric_type = _normalize_metric_type(metric.type)
+            if metric_type is None or ts < cutoff or not self._watermark.is_new(ts, metric.id):
+                continue
+            fresh.append((ts, metric.id, metric.username, metric_type))
+        fresh.sort(key=lambda event: (event[0], event[1]))
+        return self._ingest_fresh(fresh)
+
+    def ingest_columns(self, columns: MetricsColumns, *, now: datetime | None = None) -> int:
+        cutoff = self._cutoff(now or datetime.now(timezone.utc))
+        return self._ingest_fresh(fresh_column_events(columns, cutoff, self._watermark))
+
+    def aggregate(self, granularity: Granularity, buckets: int, *, now: datetime | None = None) -> MetricsAggregate:
+        """Диаграмма из buckets последних периодов (текущий включительно) и сводка за весь этот диапазон."""
+        now = now or datetime.now(timezone.utc)
+        self.evict(now)
+        starts = bucket_starts(granularity, max(1, buckets), now.date())
+        return MetricsAggregate(
+            summary=self.summary(starts[0], now.date()),
+            chart=self._chart(granularity, starts, now.date()),
+        )
+
+    def summary(self, start: date, end: date) -> MetricsSummary:
+        """Сводка за дни [start, end]."""
+        days = [self._days[day] for day in _date_range(start, end) if day in self._days]
+        submit_count = sum(day.submit_count for day in days)
+        change_count = sum(day.change_count for day in days)
+        submit_minutes = sum(day.submit_minutes for day in days)
+        between_minutes = sum(day.between_minutes for day in days)
+        between_count = sum(day.between_count for day in days)
+
+        if all(day.user_submits is not None for day in days):
+            user_count = len(set().union(*(day.user_submits for day in days if day.user_submits)))
+        else:
+            user_count = DistinctSketch.union(day.submit_users for day in days).estimate()
+
+        return MetricsSummary(
+            average_submissions_per_user=submit_count / user_count if user_count else 0.0,
+            change_percent=(change_count / submit_count * 100) if submit_count else 0.0,
+            average_submit_minutes=submit_minutes / submit_count if submit_count else None,
+            average_between_submits_minutes=between_minutes / between_count if between_count else None,
+            submit_count=submit_count,
+            change_count=change_count,
+            user_count=user_count,
+            submit_minutes_percentiles=KllSketch.merged(day.submit_minutes_sketch for day in days).percentiles(),
+            between_submits_percentiles=KllSketch.merged(day.between_sketch for day in days).percentiles(),
+        )
+
+    def evict(self, now: datetime) -> None:
+        oldest = now.date() - timedelta(days=self.retention_days - 1)
+        exact_from = now.date() - timedelta(days=self.exact_days - 1)
+        self._days = {day: state for day, state in self._days.items() if day >= oldest}
+        for day, state in self._days.items():
+            if day < exact_from:
+                state.user_submits = None
+        cutoff = _start_of_day(oldest)
+        self._last_submit = {user: ts for user, ts in self._last_submit.items() if ts >= cutoff}
+
+    def _ingest_fresh(self, fresh: list[tuple[datetime, int, str, MetricType]]) -> int:
+        for ts, metric_id, username, metric_type in fresh:
+            self._apply(ts, username, metric_type)
+            self._watermark.advance(ts, metric_id)
+        return len(fresh)
+
+    def _apply(self, ts: datetime, username: str, metric_type: MetricType) -> None:
+        day = self._days.get(ts.date())
+        if day is None:
+            day = self._days[ts.date()] = _DayRollup()
+        day.users.add(username)
+
+        if metric_type == MetricType.Submit:
+            minute_of_day = ts.hour * 60 + ts.minute + ts.second / 60
+            day.submit_count += 1
+            day.submit_minutes += minute_of_day
+            day.submit_minutes_sketch.update(minute_of_day)
+            day.submit_users.add(username)
+            if day.user_submits is not None:
+                day.user_submits[username] += 1
+
+            previous = self._last_submit.get(username)
+            if previous is not None:
+                previous_day = self._days.get(previous.date())
+                if previous_day is not None:
+                    between = (ts - previous).total_seconds() / 60
+                    previous_day.between_minutes += between
+                    previous_day.between_count += 1
+                    previous_day.between_sketch.update(between)
+            self._last_submit[username] = ts
+        elif metric_type == MetricType.Change:
+            day.change_count += 1
+            day.change_users.add(username)
+
+    def _chart(self, granularity: Granularity, starts: list[date], today: date) -> ChartData:
+        chart = ChartData([], [], [], [], [], [], [], title=CHART_TITLES[granularity])
+        ends = [start - timedelta(days=1) for start in starts[1:]] + [today]
+        for start, end in zip(starts, ends):
+            days = [self._days[day] for day in _date_range(start, end) if day in self._days]
+            submit_count = sum(day.submit_count for day in days)
+            change_count = sum(day.change_count for day in days)
+            total = submit_count + change_count
+            chart.labels.append(bucket_label(granularity, start))
+            chart.submit_counts.append(submit_count)
+            chart.change_counts.append(change_count)
+            chart.total_counts.append(total)
+            chart.avg_per_user.append(_per_user(total, DistinctSketch.union(d.users for d in days)))
+            chart.avg_submit_per_user.append(
+                _per_user(submit_count, DistinctSketch.union(d.submit_users for d in days))
+            )
+            chart.avg_change_per_user.append(
+                _per_user(change_count, DistinctSketch.union(d.change_users for d in days))
+            )
+        return chart
+
+    def _cutoff(self, now: datetime) -> datetime:
+        return _start_of_day(now.date() - timedelta(days=self.retention_days - 1))
+
+
+CHART_TITLES = {
+    Granularity.DAY: "Метрики по дням",
+    Granularity.WEEK: "Метрики по неделям",
+    Granularity.MONTH: "Метрики по месяцам",
+}
+
+
+def bucket_starts(granularity: Granularity, buckets: int, today: date) -> list[date]:
+    """Первые дни buckets последних периодов, от старого к текущему."""
+    if granularity == Granularity.DAY:
+        return [today - timedelta(days=buckets - 1 - i) for i in range(buckets)]
+    if granularity == Granularity.WEEK:
+        current = today - timedelta(days=today.weekday())
+        return [current - timedelta(days=7 * (buckets - 1 - i)) for i in range(buckets)]
+    month_index = today.year * 12 + today.month - 1
+    return [
+        date((month_index - buckets + 1 + i) // 12, (month_index - buckets + 1 + i) % 12 + 1, 1)
+        for i in range(buckets)
+    ]
+
+
+def bucket_label(granularity: Granularity, start: date) -> str:
+    if granularity == Granularity.DAY:
+        return start.strftime("%d.%m")
+    if granularity == Granularity.WEEK:
+        return _week_label(start)
+    return start.strftime("%m.%Y")
+
+
+def _date_range(start: date, end: date) -> Iterable[date]:
+    for offset in range((end - start).days + 1):
+        yield start + timedelta(days=offset)
+
+
+def _start_of_day(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+
+
+def _per_user(total: int, users: DistinctSketch) -> float:
+    count = users.estimate()
+    return total / count if count else 0.0
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from src.moderation.models import MetricModel
+from src.utilities.metrics_columnar import EPOCH, MetricsColumns, to_epoch_us
+
+RECORD = np.dtype([("id", "<i8"), ("ts", "<i8"), ("type", "i1"), ("user", "<i4")])
+EVENTS_FILE = "events.bin"
+EVENTS_TMP_FILE = "events.bin.tmp"
+COPY_CHUNK = 1 << 20
+USERS_FILE = "users.jsonl"
+
+
+class MetricsEventStore:
+    """
+    Локальное хранилище событий метрик: записи фиксированной ширины в файле, отображённом в память.
+
+    Записи лежат отсортированными по времени, поэтому выборка за период — это два бинарных поиска
+    и срез memmap без копирования. Имена пользователей хранятся отдельной таблицей (users.jsonl),
+    в записях — только их номера. Повторно пришедшие события (тот же id) отбрасываются по
+    отсортированному массиву id.
+
+    Обычно новые события позже уже сохранённых и просто дописываются в конец; ради опоздавших событий
+    файл собирается заново во временном файле и атомарно подменяет старый (os.replace), так что после
+    падения на диске остаётся либо старая, либо новая версия целиком. Выборки, полученные из scan,
+    нужно использовать до следующего append. Методы синхронные и рассчитаны на вызов из одного потока.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._records: np.ndarray = np.empty(0, dtype=RECORD)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._usernames: list[str] = []
+        self._user_index: dict[str, int] = {}
+        self._users_written = 0
+        self.synced_at: float | None = None  # time.monotonic() последнего append
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def usernames(self) -> list[str]:
+        return self._usernames
+
+    def load(self) -> None:
+        """Открывает файлы; недописанные после падения хвосты отбрасываются."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        users_path = self.directory / USERS_FILE
+        if users_path.exists():
+            with open(users_path, "rb") as f:
+                lines = f.read().split(b"\n")
+            complete = lines[:-1]  # после последнего перевода строки — пусто или недописанная строка
+            self._usernames = [json.loads(line) for line in complete]
+            os.truncate(users_path, sum(len(line) + 1 for line in complete))
+        self._user_index = {name: i for i, name in enumerate(self._usernames)}
+        self._users_written = len(self._usernames)
+
+        # Временный файл остаётся, только если процесс упал до os.replace; events.bin при этом цел.
+        (self.directory / EVENTS_TMP_FILE).unlink(missing_ok=True)
+        events_path = self.directory / EVENTS_FILE
+        if events_path.exists():
+            size = events_path.stat().st_size
+            complete_size = size - size % RECORD.itemsize
+            if complete_size != size:
+                os.truncate(events_path, complete_size)
+            # Записи с номером пользователя, который не успел попасть в таблицу, нельзя прочитать.
+            self._remap()
+            known = self._records["user"] < len(self._usernames)
+            if not known.all():
+                records = np.array(self._records[known])
+                self._records = np.empty(0, dtype=RECORD)
+                self._rewrite(0, records)
+        self._ids = np.sort(self._records["id"])
+
+    def append(self, metrics: Sequence[MetricModel]) -> int:
+        return self.append_columns(MetricsColumns.from_models(metrics))
+
+    def append_columns(self, columns: MetricsColumns) -> int:
+        """Сохраняет новые события; возвращает, сколько добавлено (без уже сохранённых id)."""
+        self.synced_at = time.monotonic()
+        if len(columns) == 0:
+            return 0
+        ids = np.asarray(columns.ids)
+        _, first = np.unique(ids, return_index=True)  # повторы внутри одной выгрузки тоже отбрасываем
+        fresh = np.zeros(len(ids), dtype=bool)
+        fresh[first] = True
+        if len(self._ids):
+            pos = np.searchsorted(self._ids, ids).clip(max=len(self._ids) - 1)
+            fresh &= self._ids[pos] != ids
+        if not fresh.any():
+            return 0
+
+        user_map = np.array([self._intern(name) for name in columns.usernames], dtype=np.int32)
+        batch = np.empty(int(fresh.sum()), dtype=RECORD)
+        batch["id"] = ids[fresh]
+        batch["ts"] = np.asarray(columns.timestamps)[fresh]
+        batch["type"] = np.asarray(columns.types)[fresh]
+        batch["user"] = user_map[np.asarray(columns.users)[fresh]]
+        batch.sort(order=["ts", "id"])
+        self._flush_usernames()
+
+        tail = len(self._records)
+        insert_at = int(np.searchsorted(self._records["ts"], batch["ts"][0], side="right")) if tail else 0
+        if insert_at == tail:
+            with open(self.directory / EVENTS_FILE, "ab") as f:
+                f.write(batch.tobytes())
+            self._remap()
+        else:
+            merged = np.concatenate([self._records[insert_at:], batch])
+            merged.sort(order=["ts", "id"], kind="stable")
+            self._rewrite(insert_at, merged)
+
+        new_ids = np.sort(batch["id"])
+        self._ids = np.insert(self._ids, np.searchsorted(self._ids, new_ids), new_ids)
+        return len(batch)
+
+    def scan(self, start: datetime | None = None, end: datetime | None = None) -> MetricsColumns:
+        """События с start <= время < end. Колонки — представления memmap, данные не копируются."""
+        timestamps = self._records["ts"]
+        lo = int(np.searchsorted(timestamps, to_epoch_us(start), side="left")) if start is not None else 0
+        hi = int(np.searchsorted(timestamps, to_epoch_us(end), side="left")) if end is not None else len(timestamps)
+        records = self._records[lo:hi]
+        return MetricsColumns(
+            ids=records["id"],
+            timestamps=records["ts"],
+            types=records["type"],
+            users=records["user"],
+            usernames=self._usernames,
+        )
+
+    def latest(self) -> datetime | None:
+        if not len(self._records):
+            return None
+        return EPOCH + timedelta(microseconds=int(self._records["ts"][-1]))
+
+    def _intern(self, username: str) -> int:
+        index = self._user_index.get(username)
+        if index is None:
+            index = self._user_index[username] = len(self._usernames)
+            self._usernames.append(username)
+        return index
+
+    def _flush_usernames(self) -> None:
+        # Таблица имён дописывается раньше записей событий, чтобы после падения у записей были имена.
+        if self._users_written == len(self._usernames):
+            return
+        new = self._usernames[self._users_written :]
+        with open(self.directory / USERS_FILE, "ab") as f:
+            f.write(b"".join(json.dumps(name, ensure_ascii=False).encode() + b"\n" for name in new))
+        self._users_written = len(self._usernames)
+
+    def _rewrite(self, offset: int, records: np.ndarray) -> None:
+        """Заменяет записи начиная с offset на records: файл пишется заново и подменяется атомарно."""
+        path = self.directory / EVENTS_FILE
+        tmp_path = self.directory / EVENTS_TMP_FILE
+        with open(tmp_path, "wb") as f:
+            if offset:
+                # Неизменный префикс копируется из файла порциями, а не читается в память целиком.
+                with open(path, "rb") as old:
+                    remaining = offset * RECORD.itemsize
+                    while remaining:
+                        chunk = old.read(min(remaining, COPY_CHUNK))
+                        if not chunk:
+                            raise OSError(f"{path} is shorter than its memory map")
+                        f.write(chunk)
+                        remaining -= len(chunk)
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._remap()
+
+    def _remap(self) -> None:
+        path = self.directory / EVENTS_FILE
+        if not path.exists() or path.stat().st_size == 0:
+            self._records = np.empty(0, dtype=RECORD)
+            return
+        self._records = np.memmap(path, dtype=RECORD, mode="r")
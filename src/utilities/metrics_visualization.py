@@ -2,16 +2,13 @@ from __future__ import annotations
 
 import io
 from collections import defaultdict
-from collections.abc import Sequence
+from collections.abc import Callable, Iterator, Sequence
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta, timezone
-
-import matplotlib
-import matplotlib.pyplot as plt
+from types import ModuleType
 
 from src.moderation.models import MetricModel, MetricType
-
-matplotlib.use("Agg")
+from src.utilities.quantiles import KllSketch
 
 
 @dataclass
@@ -23,6 +20,29 @@ class MetricsSummary:
     submit_count: int
     change_count: int
     user_count: int
+    # p50/p90/p99 (см. quantiles.PERCENTILES) из скетчей; пустой кортеж — нет данных.
+    submit_minutes_percentiles: tuple[float, ...] = ()
+    between_submits_percentiles: tuple[float, ...] = ()
+
+
+@dataclass
+class ChartData:
+    """Готовые ряды для диаграммы по неделям, дням или месяцам (только простые списки, дёшево передавать в процесс)."""
+
+    labels: list[str]
+    submit_counts: list[int]
+    change_counts: list[int]
+    total_counts: list[int]
+    avg_per_user: list[float]
+    avg_submit_per_user: list[float]
+    avg_change_per_user: list[float]
+    title: str = "Метрики по неделям"
+
+
+@dataclass
+class MetricsAggregate:
+    summary: MetricsSummary
+    chart: ChartData
 
 
 @dataclass
@@ -38,6 +58,16 @@ def build_metrics_visualization(
     """
     Собирает агрегированную статистику (последняя неделя) и строит диаграмму по неделям.
     """
+    aggregate = aggregate_metrics(metrics, now=now, weeks=weeks)
+    return MetricsVisualization(summary=aggregate.summary, image_bytes=render_chart(aggregate.chart))
+
+
+def aggregate_metrics(
+    metrics: Sequence[MetricModel], *, now: datetime | None = None, weeks: int = 4
+) -> MetricsAggregate:
+    """
+    Считает сводку за последнюю неделю и ряды диаграммы по неделям без отрисовки.
+    """
     now = now or datetime.now(timezone.utc)
     weeks = max(1, weeks)
 
@@ -60,26 +90,44 @@ def build_metrics_visualization(
     chart_start_date = current_week_start - timedelta(days=7 * (weeks - 1))
     chart_start_dt = datetime.combine(chart_start_date, datetime.min.time(), tzinfo=timezone.utc)
     chart_events = [(m, ts, t) for m, ts, t in events if ts >= chart_start_dt]
-    (
-        labels,
-        submit_counts,
-        change_counts,
-        total_counts,
-        avg_per_user,
-        avg_submit_per_user,
-        avg_change_per_user,
-    ) = _weekly_counts(chart_events, chart_start_date, weeks)
+    chart = ChartData(*_weekly_counts(chart_events, chart_start_date, weeks))
+    return MetricsAggregate(summary=summary, chart=chart)
 
-    image_bytes = _render_chart(
-        labels,
-        submit_counts,
-        change_counts,
-        total_counts,
-        avg_per_user,
-        avg_submit_per_user,
-        avg_change_per_user,
+
+def render_chart(chart: ChartData, renderer: str = "matplotlib") -> bytes:
+    """PNG с диаграммой; renderer — имя бэкенда из CHART_RENDERERS."""
+    return get_chart_renderer(renderer)(chart)
+
+
+def get_chart_renderer(name: str) -> Callable[[ChartData], bytes]:
+    try:
+        loader = CHART_RENDERERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown chart renderer {name!r}, expected one of {sorted(CHART_RENDERERS)}") from None
+    return loader()
+
+
+def warm_up_chart_renderer(name: str) -> None:
+    """Заранее импортирует то, что нужно бэкенду: pyplot для matplotlib, Pillow и шрифты для pillow."""
+    if name == "pillow":
+        from src.utilities.chart_pillow import load_font
+
+        load_font(20)
+    else:
+        load_pyplot()
+
+
+def render_chart_matplotlib(chart: ChartData) -> bytes:
+    return _render_chart(
+        chart.labels,
+        chart.submit_counts,
+        chart.change_counts,
+        chart.total_counts,
+        chart.avg_per_user,
+        chart.avg_submit_per_user,
+        chart.avg_change_per_user,
+        title=chart.title,
     )
-    return MetricsVisualization(summary=summary, image_bytes=image_bytes)
 
 
 def format_average_time(avg_minutes: float | None) -> str:
@@ -106,6 +154,13 @@ def format_duration_minutes(avg_minutes: float | None) -> str:
     return f"{minutes}м"
 
 
+def format_percentiles(values: Sequence[float], formatter: Callable[[float | None], str]) -> str:
+    """p50 / p90 / p99 через formatter; для пустого кортежа — «нет данных»."""
+    if not values:
+        return formatter(None)
+    return " / ".join(formatter(value) for value in values)
+
+
 def _build_summary(
     submit_events: Sequence[tuple[MetricModel, datetime]],
     change_events: Sequence[tuple[MetricModel, datetime]],
@@ -120,8 +175,8 @@ def _build_summary(
 
     avg_submissions = submit_count / user_count if user_count else 0.0
     change_percent = (change_count / submit_count * 100) if submit_count else 0.0
-    avg_submit_minutes = _average_submit_time(submit_events)
-    avg_between_submits = _average_between_submits(submit_events)
+    avg_submit_minutes, submit_sketch = _submit_time_stats(submit_events)
+    avg_between_submits, between_sketch = _between_submits_stats(submit_events)
 
     return MetricsSummary(
         average_submissions_per_user=avg_submissions,
@@ -131,40 +186,56 @@ def _build_summary(
         submit_count=submit_count,
         change_count=change_count,
         user_count=user_count,
+        submit_minutes_percentiles=submit_sketch.percentiles(),
+        between_submits_percentiles=between_sketch.percentiles(),
     )
 
 
-def _average_submit_time(
+def _submit_time_stats(
     events: Sequence[tuple[MetricModel, datetime]],
-) -> float | None:
+) -> tuple[float | None, KllSketch]:
+    sketch = KllSketch()
     if not events:
-        return None
+        return None, sketch
+
+    sketch.update_many(_minutes_of_day(events))
+    return sum(_minutes_of_day(events)) / len(events), sketch
 
-    total_minutes = sum(ts.hour * 60 + ts.minute + ts.second / 60 for _, ts in events)
-    return total_minutes / len(events)
 
+def _minutes_of_day(events: Sequence[tuple[MetricModel, datetime]]) -> Iterator[float]:
+    return (ts.hour * 60 + ts.minute + ts.second / 60 for _, ts in events)
 
-def _average_between_submits(
+
+def _between_submits_stats(
     events: Sequence[tuple[MetricModel, datetime]],
-) -> float | None:
+) -> tuple[float | None, KllSketch]:
+    """
+    Интервалы между соседними сдачами одного пользователя за один проход по событиям в порядке времени.
+
+    Помним только время последней сдачи каждого пользователя, а интервалы сразу уходят в сумму
+    и в скетч — списков интервалов по пользователям не строим.
+    """
+    sketch = KllSketch()
     if len(events) < 2:
-        return None
+        return None, sketch
 
-    per_user: dict[str, list[datetime]] = defaultdict(list)
-    for metric, ts in events:
-        per_user[metric.username].append(ts)
+    last_submit: dict[str, datetime] = {}
+    total = 0.0
 
-    deltas: list[float] = []
-    for timestamps in per_user.values():
-        timestamps.sort()
-        for first, second in zip(timestamps, timestamps[1:]):
-            delta_minutes = (second - first).total_seconds() / 60
-            if delta_minutes >= 0:
-                deltas.append(delta_minutes)
+    def deltas():
+        nonlocal total
+        for metric, ts in sorted(events, key=lambda event: event[1]):
+            previous = last_submit.get(metric.username)
+            last_submit[metric.username] = ts
+            if previous is not None:
+                delta_minutes = (ts - previous).total_seconds() / 60
+                total += delta_minutes
+                yield delta_minutes
 
-    if not deltas:
-        return None
-    return sum(deltas) / len(deltas)
+    sketch.update_many(deltas())
+    if not sketch.count:
+        return None, sketch
+    return total / sketch.count, sketch
 
 
 def _weekly_counts(
@@ -189,9 +260,7 @@ def _weekly_counts(
     change_users_per_week: list[set[str]] = [set() for _ in range(weeks)]
 
     for i in range(weeks):
-        week_start = start_week_date + timedelta(days=7 * i)
-        week_end = week_start + timedelta(days=6)
-        labels.append(f"{week_start.strftime('%d.%m')}-{week_end.strftime('%d.%m')}")
+        labels.append(_week_label(start_week_date + timedelta(days=7 * i)))
 
     for metric, ts, m_type in events:
         week_index = (ts.date() - start_week_date).days // 7
@@ -231,6 +300,39 @@ def _weekly_counts(
     )
 
 
+def _week_label(week_start: date) -> str:
+    week_end = week_start + timedelta(days=6)
+    return f"{week_start.strftime('%d.%m')}-{week_end.strftime('%d.%m')}"
+
+
+def _pillow_renderer() -> Callable[[ChartData], bytes]:
+    # Импорт внутри: chart_pillow сам импортирует этот модуль.
+    from src.utilities.chart_pillow import render_chart_pillow
+
+    return render_chart_pillow
+
+
+# Бэкенды отрисовки: имя -> функция, которая возвращает рендерер (модули бэкендов грузятся по требованию).
+CHART_RENDERERS: dict[str, Callable[[], Callable[[ChartData], bytes]]] = {
+    "matplotlib": lambda: render_chart_matplotlib,
+    "pillow": _pillow_renderer,
+}
+
+
+def load_pyplot() -> ModuleType:
+    """
+    Импортирует matplotlib.pyplot с бэкендом Agg при первой отрисовке.
+
+    pyplot грузится заметную долю секунды, поэтому не держим его в импортах модуля: так быстрее старт бота.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
 def _render_chart(
     labels: Sequence[str],
     submit_counts: Sequence[int],
@@ -239,8 +341,11 @@ def _render_chart(
     avg_per_user: Sequence[float],
     avg_submit_per_user: Sequence[float],
     avg_change_per_user: Sequence[float],
+    *,
+    title: str = "Метрики по неделям",
 ) -> bytes:
-    fig, ax = plt.subplots(figsize=(9, 4))
+    plt = load_pyplot()
+    fig, ax = plt.subplots(figsize=(9 if len(labels) <= 8 else min(18, 3 + len(labels) * 0.6), 4))
     x_positions = list(range(len(labels)))
     width = 0.18
 
@@ -277,14 +382,17 @@ def _render_chart(
     )
 
     ax.set_ylabel("Количество событий")
-    ax.set_title("Метрики по неделям")
+    ax.set_title(title)
     ax.set_xticks(x_positions)
-    ax.set_xticklabels(labels)
+    # Много столбцов (например, /metrics day 30) — подписи поворачиваем, чтобы не налезали друг на друга.
+    ax.set_xticklabels(labels, rotation=45 if len(labels) > 8 else 0, ha="right" if len(labels) > 8 else "center")
     ax.legend()
     ax.grid(axis="y", linestyle="--", linewidth=0.6, alpha=0.5)
 
-    # Текстовые подписи: общее количество и среднее на пользователя
-    for idx, x in enumerate(x_positions):
+    # Текстовые подписи: общее количество и среднее на пользователя. При большом числе столбцов
+    # они налезают друг на друга, поэтому рисуем их только для коротких диаграмм.
+    annotated = x_positions if len(labels) <= 8 else []
+    for idx, x in enumerate(annotated):
         total = total_counts[idx]
         avg = avg_per_user[idx]
         text = f"{total} (ср {avg:.1f}/польз)"
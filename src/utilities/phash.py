@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import io
+import os
+from dataclasses import dataclass
+from enum import IntEnum
+
+import numpy as np
+
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+# Больший радиус потребовал бы перебирать варианты кусков с 3+ отличающимися битами.
+MAX_RADIUS = 3 * CHUNKS - 1
+
+_DCT_SIZE = 32
+_LOW_FREQ = 8
+
+RECORD = np.dtype([("hash", "<u8"), ("ref", "<i8"), ("kind", "i1")])
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def perceptual_hash(data: bytes) -> int:
+    """
+    64-битный pHash: знаки низкочастотных коэффициентов DCT уменьшенного серого изображения относительно медианы.
+
+    Устойчив к пережатию, изменению размера и небольшой цветокоррекции.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("L", (_DCT_SIZE * 4, _DCT_SIZE * 4))
+        gray = ImageOps.exif_transpose(image).convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.Resampling.LANCZOS)
+        pixels = np.asarray(gray, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:_LOW_FREQ, :_LOW_FREQ].ravel()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hash_images(images: list[bytes]) -> list[int | None]:
+    """Хэширует пачку изображений за один вызов пула; битые изображения дают None."""
+    hashes: list[int | None] = []
+    for data in images:
+        try:
+            hashes.append(perceptual_hash(data))
+        except Exception:
+            hashes.append(None)
+    return hashes
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class HashKind(IntEnum):
+    USER = 0
+    EXAMPLE = 1
+
+
+@dataclass(frozen=True)
+class HashMatch:
+    hash: int
+    ref: int
+    kind: HashKind
+    distance: int
+
+
+def _chunk_variants(value: int, radius: int) -> list[int]:
+    """Все значения куска, отличающиеся от value не больше чем в radius битах."""
+    variants = [value]
+    frontier = [(value, -1)]
+    for _ in range(radius):
+        next_frontier = []
+        for current, last_bit in frontier:
+            for bit in range(last_bit + 1, CHUNK_BITS):
+                flipped = current ^ (1 << bit)
+                variants.append(flipped)
+                next_frontier.append((flipped, bit))
+        frontier = next_frontier
+    return variants
+
+
+class _Segment:
+    """Неизменяемая часть индекса: для каждого куска хэша — отсортированные значения и позиции записей."""
+
+    def __init__(self, records: np.ndarray):
+        self.records = records
+        self.hashes = records["hash"]
+        index_type = np.int32 if len(records) < 2**31 else np.int64
+        self.orders: list[np.ndarray] = []
+        self.keys: list[np.ndarray] = []
+        for j in range(CHUNKS):
+            chunk = ((self.hashes >> np.uint64(j * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.uint16)
+            order = np.argsort(chunk, kind="stable").astype(index_type)
+            self.orders.append(order)
+            self.keys.append(chunk[order])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def candidates(self, variants: list[np.ndarray]) -> np.ndarray:
+        """Позиции записей, у которых хотя бы один кусок совпал с одним из вариантов (возможны повторы)."""
+        parts = []
+        for order, keys, chunk_variants in zip(self.orders, self.keys, variants):
+            lo = np.searchsorted(keys, chunk_variants, side="left")
+            counts = np.searchsorted(keys, chunk_variants, side="right") - lo
+            total = int(counts.sum())
+            if total:
+                # Склеиваем диапазоны [lo, lo + count) в один массив индексов без цикла на Python.
+                offsets = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+                parts.append(order[offsets + np.arange(total)])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+
+class HashIndex:
+    """
+    Индекс 64-битных перцептивных хэшей с поиском по радиусу Хэмминга (multi-index hashing).
+
+    Хэш делится на CHUNKS кусков: если расстояние не больше radius, то хотя бы один кусок отличается
+    не больше чем на radius // CHUNKS бит, поэтому кандидатов ищем по точным значениям кусков и их
+    ближайшим вариантам, а затем проверяем полным расстоянием.
+
+    Основная часть хранится в отсортированных массивах NumPy (_Segment), новые записи — в небольшой
+    хэш-таблице, которая периодически сливается в сегмент. Записи дописываются в файл path.
+    """
+
+    def __init__(self, path: str | None = None, *, compact_threshold: int = 20_000):
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self._segment = _Segment(np.empty(0, dtype=RECORD))
+        self._delta: list[tuple[int, int, int]] = []
+        self._delta_tables: list[dict[int, list[int]]] = [{} for _ in range(CHUNKS)]
+        self._unsaved: list[tuple[int, int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._segment) + len(self._delta)
+
+    @property
+    def needs_compaction(self) -> bool:
+        return len(self._delta) >= self.compact_threshold
+
+    def load(self) -> None:
+        """Читает записи из path. Недописанная последняя запись (после падения) отбрасывается."""
+        if self.path is None or not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        complete = size - size % RECORD.itemsize
+        if complete != size:
+            os.truncate(self.path, complete)
+        records = np.fromfile(self.path, dtype=RECORD)
+        self._segment = _Segment(records)
+        self._reset_delta([])
+
+    def search(self, value: int, radius: int) -> list[HashMatch]:
+        if not 0 <= radius <= MAX_RADIUS:
+            raise ValueError(f"radius must be between 0 and {MAX_RADIUS}, got {radius}")
+        chunk_radius = radius // CHUNKS
+        chunks = [(value >> (j * CHUNK_BITS)) & CHUNK_MASK for j in range(CHUNKS)]
+        variants = [_chunk_variants(chunk, chunk_radius) for chunk in chunks]
+
+        matches = []
+        positions = self._segment.candidates([np.array(v, dtype=np.uint16) for v in variants])
+        if len(positions):
+            distances = np.bitwise_count(self._segment.hashes[positions] ^ np.uint64(value))
+            hits = np.unique(positions[distances <= radius])
+            records = self._segment.records[hits]
+            for hash_value, ref, kind in records.tolist():
+                distance = hamming(hash_value, value)
+                matches.append(HashMatch(hash=hash_value, ref=ref, kind=HashKind(kind), distance=distance))
+
+        seen: set[int] = set()
+        for table, chunk_variants in zip(self._delta_tables, variants):
+            for variant in chunk_variants:
+                for pos in table.get(variant, ()):
+                    if pos in seen:
+                        continue
+                    seen.add(pos)
+                    hash_value, ref, kind = self._delta[pos]
+                    distance = hamming(hash_value, value)
+                    if distance <= radius:
+                        matches.append(HashMatch(hash=hash_value, ref=ref, kind=HashKind(kind), distance=distance))
+        return matches
+
+    def contains(self, value: int, ref: int, kind: HashKind) -> bool:
+        return any(match.ref == ref and match.kind == kind for match in self.search(value, 0))
+
+    def add(self, value: int, ref: int, kind: HashKind) -> None:
+        record = (value, ref, int(kind))
+        self._append_delta(record)
+        self._unsaved.append(record)
+
+    def take_unsaved(self) -> list[tuple[int, int, int]]:
+        unsaved, self._unsaved = self._unsaved, []
+        return unsaved
+
+    def save(self, records: list[tuple[int, int, int]]) -> None:
+        """Дописывает записи в файл; вызывается вне event loop."""
+        if self.path is None or not records:
+            return
+        with open(self.path, "ab") as f:
+            f.write(np.array(records, dtype=RECORD).tobytes())
+
+    def snapshot(self) -> tuple[np.ndarray, int]:
+        """Записи для слияния (сегмент + текущая дельта) и размер взятой дельты."""
+        delta = np.array(self._delta, dtype=RECORD)
+        return np.concatenate([self._segment.records, delta]), len(self._delta)
+
+    @staticmethod
+    def build_segment(records: np.ndarray) -> _Segment:
+        return _Segment(records)
+
+    def install(self, segment: _Segment, merged: int) -> None:
+        """Подменяет сегмент слитым; записи дельты, добавленные во время слияния, остаются в дельте."""
+        self._segment = segment
+        self._reset_delta(self._delta[merged:])
+
+    def _append_delta(self, record: tuple[int, int, int]) -> None:
+        pos = len(self._delta)
+        self._delta.append(record)
+        for j, table in enumerate(self._delta_tables):
+            table.setdefault((record[0] >> (j * CHUNK_BITS)) & CHUNK_MASK, []).append(pos)
+
+    def _reset_delta(self, records: list[tuple[int, int, int]]) -> None:
+        self._delta = []
+        self._delta_tables = [{} for _ in range(CHUNKS)]
+        for record in records:
+            self._append_delta(record)
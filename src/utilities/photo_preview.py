@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiohttp
+
+PREVIEW_SUFFIX = ".jpg"
+
+
+def downscale_image(data: bytes, max_side: int, quality: int) -> bytes:
+    """Уменьшает изображение до max_side по большей стороне и пережимает в JPEG. Выполняется в процессе пула."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        source.draft("RGB", (max_side, max_side))  # JPEG декодируется сразу в уменьшенном масштабе
+        image = ImageOps.exif_transpose(source)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+async def download_photo(
+    session: aiohttp.ClientSession, url: str, *, max_bytes: int, timeout: aiohttp.ClientTimeout
+) -> bytes:
+    """Скачивает фото целиком, но не больше max_bytes."""
+    async with session.get(url, timeout=timeout) as resp:
+        resp.raise_for_status()
+        if resp.content_length is not None and resp.content_length > max_bytes:
+            raise ValueError(f"Photo is too large: {resp.content_length} bytes")
+        chunks = []
+        size = 0
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"Photo is larger than {max_bytes} bytes")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+
+def _warm_up_worker() -> None:
+    from PIL import Image, ImageOps  # noqa: F401
+
+
+@dataclass
+class PreviewStats:
+    cache_hits: int = 0
+    downloads: int = 0
+    failures: int = 0
+    downloaded_bytes: int = 0
+    preview_bytes: int = 0
+
+
+class PreviewDiskCache:
+    """
+    LRU-кэш превью на диске с ограничением суммарного размера.
+
+    Порядок использования хранится в памяти и при старте восстанавливается по mtime файлов.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        if key not in self._entries:
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self.total_bytes -= self._entries.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        os.utime(path)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self.total_bytes += len(data) - self._entries.pop(key, 0)
+        self._entries[key] = len(data)
+        while self.total_bytes > self.max_bytes and self._entries:
+            old_key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            self._path(old_key).unlink(missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{PREVIEW_SUFFIX}"
+
+    def _load(self) -> None:
+        if not self.directory.is_dir():
+            return
+        files = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".tmp":
+                path.unlink(missing_ok=True)
+            elif path.suffix == PREVIEW_SUFFIX:
+                stat = path.stat()
+                files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self.total_bytes += size
+
+
+class PhotoPreviewer:
+    """
+    Готовит уменьшенные превью фото задачи для отправки в Telegram.
+
+    Фото скачиваются параллельно через общую aiohttp-сессию, уменьшаются в пуле процессов
+    и складываются в дисковый LRU-кэш. Если превью сделать не удалось, вместо него возвращается None.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        cache: PreviewDiskCache,
+        *,
+        max_side: int = 1280,
+        quality: int = 80,
+        workers: int = 2,
+        fetch_concurrency: int = 8,
+        max_download_bytes: int = 20 * 1024 * 1024,
+        timeout: float = 15.0,
+    ):
+        self.session = session
+        self.cache = cache
+        self.max_side = max_side
+        self.quality = quality
+        self.workers = max(1, workers)
+        self.max_download_bytes = max_download_bytes
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.stats = PreviewStats()
+        self._fetch_semaphore = asyncio.Semaphore(max(1, fetch_concurrency))
+        self._in_flight: dict[str, asyncio.Task[bytes | None]] = {}
+        self._executor: ProcessPoolExecutor | None = None
+        # Дисковый кэш не потокобезопасен, поэтому все обращения к нему идут через один поток.
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="photo-preview-cache")
+
+    async def previews(self, urls: list[str]) -> list[bytes | None]:
+        return list(await asyncio.gather(*(self.preview(url) for url in urls)))
+
+    async def preview(self, url: str) -> bytes | None:
+        key = self._key(url)
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self._io, self.cache.get, key)
+        if data is not None:
+            self.stats.cache_hits += 1
+            return data
+
+        # Одно и то же фото, запрошенное одновременно, скачивается один раз.
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._build(url, key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def warm_up(self) -> None:
+        """Поднимает воркер уменьшения фото до первой задачи."""
+        await asyncio.get_running_loop().run_in_executor(self._get_executor(), _warm_up_worker)
+
+    async def close(self) -> None:
+        for task in list(self._in_flight.values()):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._io.shutdown(wait=True)
+
+    async def _build(self, url: str, key: str) -> bytes | None:
+        try:
+            original = await self._download(url)
+            preview = await self._downscale(original)
+            await asyncio.get_running_loop().run_in_executor(self._io, self.cache.put, key, preview)
+        except Exception as e:
+            self.stats.failures += 1
+            print(f"Error building preview for {url}: {e}")
+            return None
+        self.stats.downloads += 1
+        self.stats.downloaded_bytes += len(original)
+        self.stats.preview_bytes += len(preview)
+        return preview
+
+    async def _download(self, url: str) -> bytes:
+        async with self._fetch_semaphore:
+            return await download_photo(self.session, url, max_bytes=self.max_download_bytes, timeout=self.timeout)
+
+    async def _downscale(self, data: bytes) -> bytes:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), downscale_image, data, self.max_side, self.quality)
+        except BrokenProcessPool:
+            self._executor = None
+            raise
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up_worker,
+            )
+        return self._executor
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(f"{self.max_side}:{self.quality}:{url}".encode()).hexdigest()